@@ -0,0 +1,365 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+""" helpers for instantiating a PDDL domain with the objects of a problem.
+
+Ground atoms are represented as tuples (predicate, arg1, arg2, ...) of object
+names, so that they are hashable and can be pickled.
+"""
+
+from pythonpddl.pddl import ConstantNumber, DurativeAction, FExpression, FHead, Formula, Predicate, \
+    TimedFormula, TotalTime, TypedArg, TypedArgList
+
+
+def typeHierarchy(domain):
+    """ returns a dict from each type to the list of its ancestors (including itself and object)"""
+    parent = {}
+    for t in domain.types.args:
+        parent[t.arg_name] = t.arg_type
+    ancestors = {}
+    for t in list(parent.keys()) + ["object"]:
+        l = []
+        cur = t
+        while cur is not None and cur not in l:
+            l.append(cur)
+            cur = parent.get(cur)
+        if "object" not in l:
+            l.append("object")
+        ancestors[t] = l
+    return ancestors
+
+def objectsByType(domain, problem):
+    """ returns a dict from type name to the list of objects and constants of that type (or of a subtype)"""
+    ancestors = typeHierarchy(domain)
+    objs = {}
+    seen = {}
+    for t in ancestors:
+        objs[t] = []
+        seen[t] = set()
+    for o in domain.constants.args + problem.objects.args:
+        t = o.arg_type if o.arg_type is not None else "object"
+        for a in ancestors.get(t, [t, "object"]):
+            if a not in objs:
+                objs[a] = []
+                seen[a] = set()
+            if o.arg_name not in seen[a]:
+                seen[a].add(o.arg_name)
+                objs[a].append(o.arg_name)
+    return objs
+
+def argTypes(typedarglist):
+    """ returns the list of types of a TypedArgList, using object for untyped arguments"""
+    return [a.arg_type if a.arg_type is not None else "object" for a in typedarglist.args]
+
+
+def atomOf(literal, binding=None):
+    """ returns the atom of a Predicate or of an atomic / negated Formula, substituting variables according to binding"""
+    while isinstance(literal, Formula):
+        assert len(literal.subformulas) == 1
+        literal = literal.subformulas[0]
+    if binding is None:
+        return (literal.name,) + tuple(a.arg_name for a in literal.args.args)
+    return (literal.name,) + tuple(binding.get(a.arg_name, a.arg_name) for a in literal.args.args)
+
+def schemaLiterals(schema):
+    """ returns (positive preconditions, negative preconditions, add effects, delete effects) of an
+    Action or DurativeAction as lists of lifted atoms. Durative actions are taken in their compressed
+    form: conditions at start and over all are preconditions, effects at start and at end are effects"""
+    if isinstance(schema, DurativeAction):
+        pre_pos = schema.get_cond("start", True) + schema.get_cond("all", True)
+        pre_neg = schema.get_cond("start", False) + schema.get_cond("all", False)
+        add = schema.get_eff("start", True) + schema.get_eff("end", True)
+        dele = schema.get_eff("start", False) + schema.get_eff("end", False)
+    else:
+        pre_pos = schema.get_pre(True)
+        pre_neg = schema.get_pre(False)
+        add = schema.get_eff(True)
+        dele = schema.get_eff(False)
+    return tuple(list(map(atomOf, l)) for l in [pre_pos, pre_neg, add, dele])
+
+def snapLiterals(schema):
+    """ returns the list of (positive preconditions, negative preconditions, add effects, delete effects) of the
+    snap actions of a schema: the action itself for an Action, and for a DurativeAction its start (conditions at
+    start and over all, effects at start) and its end (conditions at end and over all, effects at end)"""
+    if not isinstance(schema, DurativeAction):
+        return [schemaLiterals(schema)]
+    snaps = []
+    for t in ["start", "end"]:
+        pre_pos = schema.get_cond(t, True) + schema.get_cond("all", True)
+        pre_neg = schema.get_cond(t, False) + schema.get_cond("all", False)
+        add = schema.get_eff(t, True)
+        dele = schema.get_eff(t, False)
+        snaps.append(tuple(list(map(atomOf, l)) for l in [pre_pos, pre_neg, add, dele]))
+    return snaps
+
+def fluentPredicates(domain):
+    """ returns the set of names of predicates that appear in some effect (all others are static)"""
+    fluents = set()
+    for schema in domain.actions + domain.durative_actions:
+        (_, _, add, dele) = schemaLiterals(schema)
+        for atom in add + dele:
+            fluents.add(atom[0])
+    return fluents
+
+def initialAtoms(problem):
+    """ returns the set of atoms which are true in the initial state (timed initial literals are ignored)"""
+    atoms = set()
+    for initel in problem.initialstate:
+        if isinstance(initel, Formula) and initel.op is None:
+            atoms.add(atomOf(initel))
+    return atoms
+
+def goalAtoms(problem, positive):
+    """ returns the list of positive or negative atoms in the goal"""
+    return list(map(atomOf, problem.goal.get_predicates(positive)))
+
+def numericConditions(formula):
+    """ returns the list of numeric comparisons in a conjunctive goal description"""
+    if formula.op == "and":
+        l = []
+        for s in formula.subformulas:
+            l = l + numericConditions(s)
+        return l
+    elif formula.op in ['>', '<', '=', '>=', '<=']:
+        return [formula]
+    return []
+
+def numericEffects(effects):
+    """ returns the list of numeric effects (increase / decrease / assign / scale-up / scale-down) in a list of effects"""
+    l = []
+    for x in effects:
+        if x.op == "and":
+            l = l + numericEffects(x.subformulas)
+        elif x.is_numeric:
+            l.append(x)
+    return l
+
+def schemaNumeric(schema):
+    """ returns (numeric preconditions, numeric effects) of an Action or DurativeAction, compressed as in schemaLiterals"""
+    if isinstance(schema, DurativeAction):
+        pre = []
+        for x in schema.cond:
+            if x.timespecifier in ["start", "all"]:
+                pre = pre + numericConditions(x.formula)
+        eff = numericEffects([x.formula for x in schema.eff if x.timespecifier in ["start", "end"]])
+        return (pre, eff)
+    return (numericConditions(schema.pre), numericEffects(schema.eff))
+
+def instantiate(x, binding):
+    """ returns a copy of a formula / expression in which variables are replaced according to binding"""
+    if isinstance(x, Formula):
+        return Formula([instantiate(s, binding) for s in x.subformulas], x.op, x.is_effect, x.is_numeric)
+    elif isinstance(x, TimedFormula):
+        return TimedFormula(x.timespecifier, instantiate(x.formula, binding))
+    elif isinstance(x, Predicate):
+        return Predicate(x.name, instantiate(x.args, binding))
+    elif isinstance(x, FHead):
+        return FHead(x.name, instantiate(x.args, binding))
+    elif isinstance(x, FExpression):
+        return FExpression(x.op, [instantiate(s, binding) for s in x.subexps])
+    elif isinstance(x, TypedArgList):
+        return TypedArgList([TypedArg(binding.get(a.arg_name, a.arg_name), a.arg_type) for a in x.args])
+    elif isinstance(x, (ConstantNumber, TotalTime)):
+        return x
+    else:
+        raise Exception("Don't know how to instantiate " + str(x))
+
+
+class GroundAction:
+    """ represents a ground instance of an Action or DurativeAction (durative actions in compressed form)"""
+    def __init__(self, schema, args, pre_pos, pre_neg, add_eff, del_eff, num_pre, num_eff):
+        self.schema = schema
+        self.args = args                # tuple of object names, one per parameter
+        self.pre_pos = pre_pos          # tuples of ground atoms
+        self.pre_neg = pre_neg
+        self.add_eff = add_eff
+        self.del_eff = del_eff
+        self.num_pre = num_pre          # lists of ground numeric Formulas
+        self.num_eff = num_eff
+
+    def is_applicable(self, state):
+        """ checks the propositional preconditions against a set of true atoms"""
+        return all(a in state for a in self.pre_pos) and not any(a in state for a in self.pre_neg)
+
+    def apply(self, state):
+        """ returns the set of atoms which are true after applying this action to state"""
+        return (frozenset(state) - frozenset(self.del_eff)) | frozenset(self.add_eff)
+
+    def asPDDL(self):
+        return "(" + " ".join((self.schema.name,) + self.args) + ")"
+
+
+def _substitute(atom, binding):
+    """ returns a lifted atom with variables replaced according to binding"""
+    return (atom[0],) + tuple(binding.get(t, t) for t in atom[1:])
+
+def _bindings(params, domains, static_pos, static_neg, init):
+    """ enumerates the bindings of params to objects of their domains which satisfy the static preconditions"""
+    index = dict((p, i) for (i, p) in enumerate(params))
+    checks = [([], []) for _ in params]
+    for (k, static) in enumerate([static_pos, static_neg]):
+        for atom in static:
+            bound = [index[t] for t in atom[1:] if t in index]
+            if len(bound) == 0:
+                if (atom in init) != (k == 0):
+                    return
+            else:
+                checks[max(bound)][k].append(atom)
+
+    binding = {}
+    def extend(i):
+        if i == len(params):
+            yield dict(binding)
+            return
+        for o in domains[i]:
+            binding[params[i]] = o
+            if all(_substitute(a, binding) in init for a in checks[i][0]) and \
+                    not any(_substitute(a, binding) in init for a in checks[i][1]):
+                for b in extend(i + 1):
+                    yield b
+        binding.pop(params[i], None)
+    for b in extend(0):
+        yield b
+
+def groundSchema(schema, objs, init, fluents, first=None):
+    """ returns the list of GroundActions of a schema whose static preconditions hold in the initial state.
+    If first is given, only these objects are used for the first parameter"""
+    params = [a.arg_name for a in schema.parameters.args]
+    domains = [objs.get(t, []) for t in argTypes(schema.parameters)]
+    if first is not None:
+        domains[0] = first
+    (pre_pos, pre_neg, add, dele) = schemaLiterals(schema)
+    (num_pre, num_eff) = schemaNumeric(schema)
+    static_pos = [a for a in pre_pos if a[0] not in fluents]
+    static_neg = [a for a in pre_neg if a[0] not in fluents]
+    fluent_pos = [a for a in pre_pos if a[0] in fluents]
+    fluent_neg = [a for a in pre_neg if a[0] in fluents]
+
+    ops = []
+    for binding in _bindings(params, domains, static_pos, static_neg, init):
+        ground = lambda l: tuple(_substitute(a, binding) for a in l)
+        ops.append(GroundAction(schema, tuple(binding[p] for p in params),
+                                ground(fluent_pos), ground(fluent_neg), ground(add), ground(dele),
+                                [instantiate(x, binding) for x in num_pre],
+                                [instantiate(x, binding) for x in num_eff]))
+    return ops
+
+def predicateCounts(atoms):
+    """ returns a dict from predicate name to its number of atoms in a set of atoms"""
+    counts = {}
+    for atom in atoms:
+        counts[atom[0]] = counts.get(atom[0], 0) + 1
+    return counts
+
+def estimateJoinSize(schema, objs, init, fluents, first=None, counts=None):
+    """ estimates the number of instances of a schema: the product of its parameter domain sizes, scaled by the
+    fraction of possible atoms of each static predicate in its positive preconditions which are true initially.
+    counts are the predicateCounts of init, if they are already known"""
+    types = argTypes(schema.parameters)
+    sizes = dict((a.arg_name, len(objs.get(t, []))) for (a, t) in zip(schema.parameters.args, types))
+    if first is not None:
+        sizes[schema.parameters.args[0].arg_name] = len(first)
+    est = 1.0
+    for size in sizes.values():
+        est = est * size
+    if counts is None:
+        counts = predicateCounts(init)
+    for atom in schemaLiterals(schema)[0]:
+        if atom[0] in fluents:
+            continue
+        possible = 1.0
+        for t in atom[1:]:
+            possible = possible * sizes.get(t, 1)
+        if possible > 0:
+            est = est * min(1.0, counts.get(atom[0], 0) / possible)
+    return est
+
+
+_worker_state = None
+
+def _initWorker(domain, problem):
+    global _worker_state
+    schemas = domain.actions + domain.durative_actions
+    _worker_state = (schemas, objectsByType(domain, problem), initialAtoms(problem), fluentPredicates(domain))
+
+def _groundPartition(job):
+    """ grounds one schema (by index) for a partition of its first parameter, in a worker process"""
+    (schemas, objs, init, fluents) = _worker_state
+    (s, first) = job
+    return [(op.args, op.pre_pos, op.pre_neg, op.add_eff, op.del_eff, op.num_pre, op.num_eff)
+            for op in groundSchema(schemas[s], objs, init, fluents, first)]
+
+def _partitionJobs(schemas, objs, init, fluents, workers):
+    """ splits the schemas into (schema index, first parameter objects) jobs of similar estimated size.
+    Returns (jobs, estimated size of each job)"""
+    counts = predicateCounts(init)
+    estimates = [estimateJoinSize(schema, objs, init, fluents, counts=counts) for schema in schemas]
+    target = max(1.0, sum(estimates) / (4 * workers))
+    jobs = []
+    for (s, schema) in enumerate(schemas):
+        if len(schema.parameters.args) == 0:
+            jobs.append((s, None))
+            continue
+        first = objs.get(argTypes(schema.parameters)[0], [])
+        parts = int(min(len(first), max(1, estimates[s] // target)))
+        for k in range(parts):
+            jobs.append((s, first[k * len(first) // parts:(k + 1) * len(first) // parts]))
+    sizes = [estimateJoinSize(schemas[s], objs, init, fluents, first, counts) for (s, first) in jobs]
+    return (jobs, sizes)
+
+def groundActions(domain, problem, workers=1):
+    """ returns the list of GroundActions of all actions and durative actions of a domain in a problem.
+    Instances are filtered by static preconditions only, fluent preconditions are kept in the operators.
+
+    With workers > 1, the schemas and partitions of their first parameter's objects are grounded in a
+    process pool, largest estimated join first. The result is the same, in the same order, as with one worker"""
+    objs = objectsByType(domain, problem)
+    init = initialAtoms(problem)
+    fluents = fluentPredicates(domain)
+    schemas = domain.actions + domain.durative_actions
+    if workers <= 1:
+        ops = []
+        for schema in schemas:
+            ops.extend(groundSchema(schema, objs, init, fluents))
+        return ops
+
+    import multiprocessing
+    (jobs, sizes) = _partitionJobs(schemas, objs, init, fluents, workers)
+    order = sorted(range(len(jobs)), key=lambda j: -sizes[j])
+    pool = multiprocessing.Pool(workers, _initWorker, (domain, problem))
+    try:
+        results = pool.map(_groundPartition, [jobs[j] for j in order], chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+    by_job = [None] * len(jobs)
+    for (j, result) in zip(order, results):
+        by_job[j] = result
+
+    ops = []
+    seen = set()
+    for ((s, _), result) in zip(jobs, by_job):
+        for r in result:
+            key = (s, r[0])
+            if key not in seen:
+                seen.add(key)
+                ops.append(GroundAction(schemas[s], *r))
+    return ops
+
+def factTable(operators, atoms=()):
+    """ returns (list of facts, dict from fact to id) for the given atoms and all atoms in the operators,
+    numbered in order of first appearance"""
+    facts = []
+    index = {}
+    def add(l):
+        for atom in l:
+            if atom not in index:
+                index[atom] = len(facts)
+                facts.append(atom)
+    add(sorted(atoms))
+    for op in operators:
+        add(op.pre_pos)
+        add(op.pre_neg)
+        add(op.add_eff)
+        add(op.del_eff)
+    return (facts, index)
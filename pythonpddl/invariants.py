@@ -0,0 +1,409 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+""" invariant synthesis and translation to a multi-valued (SAS+) encoding.
+
+The synthesis follows the usual balance argument: an invariant covers atoms of one or more
+predicates, grouped by the values of their fixed arguments. It holds if no action can add a
+covered atom without deleting another covered atom of the same group that it requires in its
+precondition. Candidates which fail because of an unbalanced add effect are refined by adding
+a part for another predicate which that action deletes.
+
+The translation turns each group of mutually exclusive atoms into one variable, and the ground
+operators into operators on these variables, which can be written in the Fast Downward format.
+Atoms which appear negated in a precondition or in the goal are kept as binary variables, since
+"not this value" can't be expressed on a multi-valued variable.
+"""
+
+import itertools
+
+from pythonpddl.grounding import argTypes, fluentPredicates, goalAtoms, groundActions, initialAtoms, \
+    objectsByType, snapLiterals
+from pythonpddl.pddl import DurativeAction
+
+
+class InvariantPart:
+    """ represents a predicate in an invariant: the positions of its fixed arguments (in group order) and of its counted argument"""
+    def __init__(self, predicate, fixed, counted=None):
+        self.predicate = predicate
+        self.fixed = tuple(fixed)
+        self.counted = counted
+
+    def fixed_terms(self, atom):
+        return tuple(atom[1 + i] for i in self.fixed)
+
+    def _key(self):
+        return (self.predicate, self.fixed, self.counted)
+
+    def __eq__(self, other):
+        return isinstance(other, InvariantPart) and self._key() == other._key()
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __str__(self):
+        arity = len(self.fixed) + (0 if self.counted is None else 1)
+        args = ["?"] * arity
+        for (k, i) in enumerate(self.fixed):
+            args[i] = "?" + str(k)
+        if self.counted is not None:
+            args[self.counted] = "*"
+        return "(" + " ".join([self.predicate] + args) + ")"
+
+
+class Invariant:
+    """ represents an invariant: for each binding of the fixed arguments, at most one covered atom is true"""
+    def __init__(self, parts, balanced=False):
+        self.parts = frozenset(parts)
+        self.balanced = balanced      # no action deletes a covered atom without adding one to the same group
+        self.by_predicate = dict((p.predicate, p) for p in self.parts)
+        self.arity = len(next(iter(self.parts)).fixed)
+
+    def covering_part(self, atom):
+        return self.by_predicate.get(atom[0])
+
+    def __str__(self):
+        return "{" + ", ".join(sorted(map(str, self.parts))) + "}"
+
+
+def _checkAction(invariant, literals):
+    """ checks an invariant against an action or snap action. Returns (holds, balanced, refinements)"""
+    (pre_pos, pre_neg, add, dele) = literals
+    adds = []
+    for atom in add:
+        part = invariant.covering_part(atom)
+        if part is not None:
+            adds.append(part.fixed_terms(atom))
+    dels = []
+    for atom in dele:
+        part = invariant.covering_part(atom)
+        if part is not None:
+            dels.append((atom, part.fixed_terms(atom)))
+
+    balanced = all(terms in adds for (_, terms) in dels)
+    if len(adds) == 0:
+        return (True, balanced, [])
+    if len(adds) > 1:
+        return (False, False, [])
+
+    terms = adds[0]
+    for (atom, dterms) in dels:
+        if dterms == terms and atom in pre_pos:
+            return (True, balanced, [])
+
+    refinements = []
+    for atom in dele:
+        if atom[0] in invariant.by_predicate or atom not in pre_pos:
+            continue
+        args = list(atom[1:])
+        if not all(t in args for t in terms):
+            continue
+        fixed = [args.index(t) for t in terms]
+        rest = [i for i in range(len(args)) if i not in fixed]
+        if len(rest) > 1:
+            continue
+        refinements.append(InvariantPart(atom[0], fixed, rest[0] if rest else None))
+    return (False, False, refinements)
+
+def synthesizeInvariants(domain, max_parts=4):
+    """ returns the list of invariants of a domain, which hold in any initial state that satisfies them.
+    The start and end of durative actions are checked separately, as the invariant must also hold while they run"""
+    fluents = fluentPredicates(domain)
+    literals = []
+    for schema in domain.actions + domain.durative_actions:
+        literals = literals + snapLiterals(schema)
+
+    queue = []
+    for pred in domain.predicates:
+        if pred.name not in fluents:
+            continue
+        arity = len(pred.args.args)
+        for counted in range(arity):
+            fixed = [i for i in range(arity) if i != counted]
+            queue.append(frozenset([InvariantPart(pred.name, fixed, counted)]))
+
+    seen = set(queue)
+    invariants = []
+    while queue:
+        parts = queue.pop(0)
+        candidate = Invariant(parts)
+        holds = True
+        balanced = True
+        for l in literals:
+            (ok, bal, refinements) = _checkAction(candidate, l)
+            balanced = balanced and bal
+            if not ok:
+                holds = False
+                for part in refinements:
+                    if part.predicate in fluents and len(part.fixed) == candidate.arity:
+                        refined = parts | frozenset([part])
+                        if len(refined) <= max_parts and refined not in seen:
+                            seen.add(refined)
+                            queue.append(refined)
+                break
+        if holds:
+            invariants.append(Invariant(parts, balanced))
+    return invariants
+
+
+class SASVariable:
+    """ represents a multi-valued state variable, whose values are mutually exclusive atoms"""
+    def __init__(self, name, atoms, has_none):
+        self.name = name
+        self.atoms = atoms               # value i means atoms[i] is true
+        self.has_none = has_none         # if true, value len(atoms) means none of the atoms is true
+
+    def domain_size(self):
+        return len(self.atoms) + (1 if self.has_none else 0)
+
+    def asSAS(self):
+        ret = "begin_variable\n" + self.name + "\n-1\n" + str(self.domain_size()) + "\n"
+        for atom in self.atoms:
+            ret = ret + "Atom " + _atomName(atom) + "\n"
+        if self.has_none:
+            if len(self.atoms) == 1:
+                ret = ret + "NegatedAtom " + _atomName(self.atoms[0]) + "\n"
+            else:
+                ret = ret + "<none of those>\n"
+        ret = ret + "end_variable\n"
+        return ret
+
+def _atomName(atom):
+    return atom[0] + "(" + ", ".join(atom[1:]) + ")"
+
+
+class SASOperator:
+    """ represents an operator on multi-valued variables"""
+    def __init__(self, name, prevail, pre_post, cost = 1):
+        self.name = name
+        self.prevail = prevail           # list of (variable, value) conditions on variables the operator doesn't change
+        self.pre_post = pre_post         # list of (effect conditions, variable, value before or -1, value after)
+        self.cost = cost
+
+    def asSAS(self):
+        ret = "begin_operator\n" + self.name + "\n" + str(len(self.prevail)) + "\n"
+        for (var, val) in self.prevail:
+            ret = ret + str(var) + " " + str(val) + "\n"
+        ret = ret + str(len(self.pre_post)) + "\n"
+        for (conds, var, pre, post) in self.pre_post:
+            ret = ret + " ".join(map(str, [len(conds)] + [x for c in conds for x in c] + [var, pre, post])) + "\n"
+        ret = ret + str(self.cost) + "\nend_operator\n"
+        return ret
+
+
+class SASTask:
+    """ represents a task in a multi-valued variable encoding"""
+    def __init__(self, variables, init, goal, mutex_groups, num_binary_facts, operators = None):
+        self.variables = variables
+        self.init = init                         # list of values, one per variable
+        self.goal = goal                         # list of (variable, value) pairs
+        self.mutex_groups = mutex_groups         # list of lists of (variable, value) pairs
+        self.operators = operators               # list of SASOperators, or None for temporal tasks
+        self.num_binary_facts = num_binary_facts
+        self.fact_index = {}
+        for (var, v) in enumerate(variables):
+            for (val, atom) in enumerate(v.atoms):
+                self.fact_index[atom] = (var, val)
+
+    def encode_state(self, atoms):
+        """ returns the list of variable values corresponding to the set of true atoms"""
+        state = [len(v.atoms) for v in self.variables]
+        for atom in atoms:
+            if atom in self.fact_index:
+                (var, val) = self.fact_index[atom]
+                state[var] = val
+        return state
+
+    def decode_state(self, state):
+        """ returns the set of true atoms in a list of variable values"""
+        atoms = set()
+        for (v, val) in zip(self.variables, state):
+            if val < len(v.atoms):
+                atoms.add(v.atoms[val])
+        return atoms
+
+    def binary_size(self):
+        """ returns the number of bits per state in the binary encoding"""
+        return self.num_binary_facts
+
+    def sas_size(self):
+        """ returns the number of bits per state in the multi-valued encoding"""
+        return sum((v.domain_size() - 1).bit_length() for v in self.variables)
+
+    def summary(self):
+        ret = str(len(self.variables)) + " variables ("
+        ret = ret + str(len([v for v in self.variables if len(v.atoms) > 1])) + " multi-valued), "
+        ret = ret + str(self.sas_size()) + " bits per state instead of " + str(self.binary_size())
+        if self.binary_size() > 0:
+            ret = ret + " (" + "%.1f" % (100.0 * self.sas_size() / self.binary_size()) + "%)"
+        return ret
+
+    def encode_operator(self, op):
+        """ returns the SASOperator of a GroundAction, or None if its preconditions contradict each other.
+        A delete effect on an atom the operator doesn't require only applies if the atom is true"""
+        pre = {}
+        for atom in op.pre_pos:
+            (var, val) = self.fact_index[atom]
+            if pre.setdefault(var, val) != val:
+                return None
+        for atom in op.pre_neg:
+            (var, val) = self.fact_index[atom]
+            if len(self.variables[var].atoms) > 1:
+                raise Exception("Can't encode negative precondition " + _atomName(atom) + " in a multi-valued variable")
+            if pre.setdefault(var, 1) != 1:
+                return None
+        effects = [([],) + self.fact_index[atom] for atom in op.add_eff]
+        added = set(e[1] for e in effects)
+        for atom in op.del_eff:
+            (var, val) = self.fact_index[atom]
+            v = self.variables[var]
+            if var in added or pre.get(var, val) != val:
+                continue
+            if not v.has_none:
+                raise Exception("Can't encode deleting " + _atomName(atom) + " in " + op.asPDDL() +
+                                " in a variable without a none value")
+            conds = [] if var in pre or len(v.atoms) == 1 else [(var, val)]
+            effects.append((conds, var, len(v.atoms)))
+        changed = set(e[1] for e in effects)
+        prevail = sorted((var, val) for (var, val) in pre.items() if var not in changed)
+        pre_post = [(conds, var, pre.get(var, -1), post) for (conds, var, post) in effects if pre.get(var) != post]
+        return SASOperator(op.asPDDL()[1:-1], prevail, sorted(pre_post, key=lambda e: e[1]))
+
+    def asSAS(self):
+        """ returns the task in the Fast Downward translator output format (without axioms)"""
+        if self.operators is None:
+            raise Exception("Can't write a task with durative actions in Fast Downward format")
+        ret = "begin_version\n3\nend_version\nbegin_metric\n0\nend_metric\n"
+        ret = ret + str(len(self.variables)) + "\n"
+        for v in self.variables:
+            ret = ret + v.asSAS()
+        ret = ret + str(len(self.mutex_groups)) + "\n"
+        for group in self.mutex_groups:
+            ret = ret + "begin_mutex_group\n" + str(len(group)) + "\n"
+            for (var, val) in group:
+                ret = ret + str(var) + " " + str(val) + "\n"
+            ret = ret + "end_mutex_group\n"
+        ret = ret + "begin_state\n" + "\n".join(map(str, self.init)) + "\nend_state\n"
+        ret = ret + "begin_goal\n" + str(len(self.goal)) + "\n"
+        for (var, val) in self.goal:
+            ret = ret + str(var) + " " + str(val) + "\n"
+        ret = ret + "end_goal\n" + str(len(self.operators)) + "\n"
+        for op in self.operators:
+            ret = ret + op.asSAS()
+        ret = ret + "0\n"
+        return ret
+
+
+def _groundAtoms(pred_types, name, objs):
+    return [(name,) + args for args in itertools.product(*[objs.get(t, []) for t in pred_types[name]])]
+
+def _invariantGroups(invariant, pred_types, objs, init):
+    """ returns the list of (atoms, exactly_one) groups of an invariant, or None if the initial state violates it"""
+    domains = []
+    for k in range(invariant.arity):
+        d = []
+        seen = set()
+        for part in invariant.parts:
+            for o in objs.get(pred_types[part.predicate][part.fixed[k]], []):
+                if o not in seen:
+                    seen.add(o)
+                    d.append(o)
+        domains.append(d)
+    objsets = dict((t, set(l)) for (t, l) in objs.items())
+
+    groups = []
+    for binding in itertools.product(*domains):
+        atoms = []
+        for part in sorted(invariant.parts, key=lambda p: p.predicate):
+            types = pred_types[part.predicate]
+            if not all(o in objsets.get(types[i], ()) for (o, i) in zip(binding, part.fixed)):
+                continue
+            values = [None] if part.counted is None else objs.get(types[part.counted], [])
+            for val in values:
+                args = [None] * len(types)
+                for (o, i) in zip(binding, part.fixed):
+                    args[i] = o
+                if part.counted is not None:
+                    args[part.counted] = val
+                atoms.append((part.predicate,) + tuple(args))
+        true_atoms = len([a for a in atoms if a in init])
+        if true_atoms > 1:
+            return None
+        if len(atoms) > 1:
+            groups.append((atoms, invariant.balanced and true_atoms == 1))
+    return groups
+
+def translate(domain, problem, invariants=None, operators=None):
+    """ translates a problem into a multi-valued encoding, with one variable per mutex group found by
+    the invariants (synthesized from the domain if not given), and one binary variable per remaining fluent atom.
+    The ground operators (grounded from the domain if not given) are translated too, unless the domain has
+    durative actions"""
+    if invariants is None:
+        invariants = synthesizeInvariants(domain)
+    fluents = fluentPredicates(domain)
+    objs = objectsByType(domain, problem)
+    init = initialAtoms(problem)
+    pred_types = dict((p.name, argTypes(p.args)) for p in domain.predicates)
+
+    groups = []
+    for inv in invariants:
+        inv_groups = _invariantGroups(inv, pred_types, objs, init)
+        if inv_groups is not None:
+            groups = groups + inv_groups
+    groups.sort(key=lambda g: -len(g[0]))
+
+    all_atoms = []
+    for pred in domain.predicates:
+        if pred.name in fluents:
+            all_atoms = all_atoms + _groundAtoms(pred_types, pred.name, objs)
+    if operators is None:
+        operators = groundActions(domain, problem)
+    op_atoms = []
+    negated = set(goalAtoms(problem, False))
+    for op in operators:
+        op_atoms.extend(op.pre_pos + op.pre_neg + op.add_eff + op.del_eff)
+        negated.update(op.pre_neg)
+    known = set(all_atoms)
+    for atom in sorted(init) + goalAtoms(problem, True) + goalAtoms(problem, False) + op_atoms:
+        if atom[0] in fluents and atom not in known:
+            known.add(atom)
+            all_atoms.append(atom)
+
+    variables = []
+    mutex_groups = []
+    covered = set()
+    for (atoms, exactly_one) in groups:
+        remaining = [a for a in atoms if a not in covered and a not in negated]
+        if len(remaining) < 2:
+            continue
+        covered.update(remaining)
+        var = len(variables)
+        variables.append(SASVariable("var" + str(var), remaining, not exactly_one or len(remaining) < len(atoms)))
+        mutex_groups.append([(var, val) for val in range(len(remaining))])
+    for atom in all_atoms:
+        if atom not in covered:
+            variables.append(SASVariable("var" + str(len(variables)), [atom], True))
+
+    task = SASTask(variables, None, [], mutex_groups, len(all_atoms))
+    task.init = task.encode_state(init)
+    if not domain.durative_actions:
+        task.operators = []
+        for op in operators:
+            sas_op = task.encode_operator(op)
+            if sas_op is not None:
+                task.operators.append(sas_op)
+    for atom in goalAtoms(problem, True):
+        if atom in task.fact_index:
+            task.goal.append(task.fact_index[atom])
+        elif atom not in init:
+            raise Exception("Goal " + _atomName(atom) + " is static and false in the initial state")
+    for atom in goalAtoms(problem, False):
+        if atom not in task.fact_index:
+            if atom in init:
+                raise Exception("Negative goal " + _atomName(atom) + " is static and true in the initial state")
+        else:
+            task.goal.append((task.fact_index[atom][0], 1))
+    return task
@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+""" array-backed numeric state component.
+
+Ground numeric fluents are interned to ids, and a numeric state is a float64 array indexed by
+fluent id (NaN for undefined fluents). A batch of states is a 2D array with one row per state.
+
+The numeric effects and preconditions of ground operators (see grounding.groundActions) are
+compiled into flat index / coefficient arrays. Each effect sets its target fluent to
+scale * old value + constant + sum of coefficient * old value of other fluents, and each
+precondition compares constant + sum of coefficient * fluent value with 0. Expressions must
+be linear in the fluents. Several effects of an operator on the same fluent (e.g., when two
+parameters are bound to the same object) add up if they are all increase / decrease effects;
+any other combination is rejected when compiling. Operators are stored in CSR form: the effects
+of operator o are eff_start[o]:eff_start[o + 1], and the terms of effect e are
+term_start[e]:term_start[e + 1].
+
+This module requires numpy.
+"""
+
+import numpy as np
+
+from pythonpddl.pddl import ConstantNumber, FExpression, FHead
+
+
+def fluentOf(fhead):
+    """ returns the ground fluent of an FHead, as a tuple (function, arg1, arg2, ...)"""
+    return (fhead.name,) + tuple(a.arg_name for a in fhead.args.args)
+
+def initialValues(problem):
+    """ returns a dict from ground fluent to its initial value"""
+    values = {}
+    for initel in problem.initialstate:
+        if isinstance(initel, FExpression) and initel.op == "=":
+            values[fluentOf(initel.subexps[0])] = initel.subexps[1].val
+    return values
+
+
+_COMPARISONS = ['>', '<', '=', '>=', '<=']
+
+class NumericStore:
+    """ represents the numeric fluents of a problem and the compiled numeric preconditions and effects of operators"""
+    def __init__(self, problem, operators):
+        self.fluents = []
+        self.fluent_index = {}
+        values = initialValues(problem)
+        for f in values:
+            self.intern(f)
+
+        eff_start = [0]
+        eff_target = []
+        eff_scale = []
+        eff_const = []
+        term_start = [0]
+        term_fluent = []
+        term_coef = []
+        cond_start = [0]
+        cond_op = []
+        cond_const = []
+        cterm_start = [0]
+        cterm_fluent = []
+        cterm_coef = []
+        for op in operators:
+            targets = {}
+            for eff in op.num_eff:
+                (target, scale, const, lin) = self._compileEffect(eff)
+                if target in targets and (scale != 1.0 or targets[target] != 1.0):
+                    raise Exception("Conflicting numeric effects on " + eff.subformulas[0].asPDDL() +
+                                    " in " + op.asPDDL())
+                targets[target] = scale
+                eff_target.append(target)
+                eff_scale.append(scale)
+                eff_const.append(const)
+                term_fluent.extend(lin.keys())
+                term_coef.extend(lin.values())
+                term_start.append(len(term_fluent))
+            eff_start.append(len(eff_target))
+            for cond in op.num_pre:
+                (const, lin) = self._compileCondition(cond)
+                cond_op.append(_COMPARISONS.index(cond.op))
+                cond_const.append(const)
+                cterm_fluent.extend(lin.keys())
+                cterm_coef.extend(lin.values())
+                cterm_start.append(len(cterm_fluent))
+            cond_start.append(len(cond_op))
+
+        self.eff_start = np.array(eff_start, dtype=np.int64)
+        self.eff_target = np.array(eff_target, dtype=np.int64)
+        self.eff_scale = np.array(eff_scale, dtype=np.float64)
+        self.eff_const = np.array(eff_const, dtype=np.float64)
+        self.term_start = np.array(term_start, dtype=np.int64)
+        self.term_fluent = np.array(term_fluent, dtype=np.int64)
+        self.term_coef = np.array(term_coef, dtype=np.float64)
+        self.cond_start = np.array(cond_start, dtype=np.int64)
+        self.cond_op = np.array(cond_op, dtype=np.int64)
+        self.cond_const = np.array(cond_const, dtype=np.float64)
+        self.cterm_start = np.array(cterm_start, dtype=np.int64)
+        self.cterm_fluent = np.array(cterm_fluent, dtype=np.int64)
+        self.cterm_coef = np.array(cterm_coef, dtype=np.float64)
+
+        self.init = np.full(len(self.fluents), np.nan)
+        for (f, v) in values.items():
+            self.init[self.fluent_index[f]] = v
+
+    def intern(self, fluent):
+        """ returns the id of a ground fluent, assigning a new one if needed"""
+        if fluent not in self.fluent_index:
+            self.fluent_index[fluent] = len(self.fluents)
+            self.fluents.append(fluent)
+        return self.fluent_index[fluent]
+
+    def _linear(self, exp):
+        """ returns (constant, dict from fluent id to coefficient) of a linear expression"""
+        if isinstance(exp, ConstantNumber):
+            return (exp.val, {})
+        elif isinstance(exp, FHead):
+            return (0.0, {self.intern(fluentOf(exp)): 1.0})
+        elif isinstance(exp, FExpression):
+            subs = [self._linear(x) for x in exp.subexps]
+            if exp.op == "-" and len(subs) == 1:
+                return _scale(subs[0], -1.0)
+            elif exp.op == "+":
+                return _add(subs[0], subs[1], 1.0)
+            elif exp.op == "-":
+                return _add(subs[0], subs[1], -1.0)
+            elif exp.op == "*" and not subs[0][1]:
+                return _scale(subs[1], subs[0][0])
+            elif exp.op == "*" and not subs[1][1]:
+                return _scale(subs[0], subs[1][0])
+            elif exp.op == "/" and not subs[1][1]:
+                if subs[1][0] == 0:
+                    raise Exception("Can't compile division by zero in " + exp.asPDDL())
+                return _scale(subs[0], 1.0 / subs[1][0])
+        raise Exception("Can't compile non-linear expression " + exp.asPDDL())
+
+    def _compileEffect(self, eff):
+        """ returns (target, scale, constant, terms) of a numeric effect Formula"""
+        target = self.intern(fluentOf(eff.subformulas[0]))
+        (const, lin) = self._linear(eff.subformulas[1])
+        if eff.op == "increase":
+            return (target, 1.0, const, lin)
+        elif eff.op == "decrease":
+            (const, lin) = _scale((const, lin), -1.0)
+            return (target, 1.0, const, lin)
+        elif eff.op == "assign":
+            return (target, 0.0, const, lin)
+        elif eff.op == "scale-down" and not lin and const == 0:
+            raise Exception("Can't compile scaling down by zero in " + eff.asPDDL())
+        elif eff.op in ["scale-up", "scale-down"] and not lin:
+            return (target, const if eff.op == "scale-up" else 1.0 / const, 0.0, {})
+        raise Exception("Can't compile numeric effect " + eff.asPDDL())
+
+    def _compileCondition(self, cond):
+        """ returns (constant, terms) of lhs - rhs in a numeric comparison Formula"""
+        return _add(self._linear(cond.subformulas[0]), self._linear(cond.subformulas[1]), -1.0)
+
+    def _expand(self, start, ids):
+        """ returns (rows, items): for each i, the items start[ids[i]]:start[ids[i] + 1] with row i"""
+        counts = start[ids + 1] - start[ids]
+        rows = np.repeat(np.arange(len(ids)), counts)
+        offsets = np.cumsum(counts) - counts
+        items = np.arange(counts.sum()) - np.repeat(offsets, counts) + np.repeat(start[ids], counts)
+        return (rows, items)
+
+    def _broadcast(self, states, op_ids):
+        """ returns (states, op_ids) with one row per operator id, repeating a single state or a single operator"""
+        states = np.atleast_2d(states)
+        (rows, op_ids) = np.broadcast_arrays(np.arange(states.shape[0]), np.asarray(op_ids, dtype=np.int64))
+        return (states[rows], op_ids)
+
+    def apply(self, states, op_ids):
+        """ returns a copy of a batch of states, with the numeric effects of op_ids[i] applied to row i.
+        A single state or operator id is paired with each of the others"""
+        (states, op_ids) = self._broadcast(states, op_ids)
+        (rows, effs) = self._expand(self.eff_start, op_ids)
+        targets = self.eff_target[effs]
+        deltas = self.eff_const[effs].copy()
+        (pos, terms) = self._expand(self.term_start, effs)
+        np.add.at(deltas, pos, states[rows[pos], self.term_fluent[terms]] * self.term_coef[terms])
+        result = states.copy()
+        scale = self.eff_scale[effs]
+        # assign has scale 0 and must also define undefined (NaN) fluents
+        result[rows, targets] = np.where(scale == 0, 0.0, states[rows, targets] * scale)
+        np.add.at(result, (rows, targets), deltas)
+        return result
+
+    def holds(self, states, op_ids):
+        """ returns a boolean array: whether the numeric preconditions of op_ids[i] hold in row i of a batch of states.
+        A single state or operator id is paired with each of the others"""
+        (states, op_ids) = self._broadcast(states, op_ids)
+        (rows, conds) = self._expand(self.cond_start, op_ids)
+        vals = self.cond_const[conds].copy()
+        (pos, terms) = self._expand(self.cterm_start, conds)
+        np.add.at(vals, pos, states[rows[pos], self.cterm_fluent[terms]] * self.cterm_coef[terms])
+        ops = self.cond_op[conds]
+        ok = np.select([ops == 0, ops == 1, ops == 2, ops == 3, ops == 4],
+                       [vals > 0, vals < 0, vals == 0, vals >= 0, vals <= 0], False)
+        return np.bincount(rows[~ok], minlength=states.shape[0]) == 0
+
+    def asPDDL(self, state):
+        """ returns the initial state elements of the defined fluents of a state"""
+        return " ".join("(= (" + " ".join(f) + ") " + str(v) + ")"
+                        for (f, v) in zip(self.fluents, state) if not np.isnan(v))
+
+def _scale(lin, c):
+    return (lin[0] * c, dict((f, x * c) for (f, x) in lin[1].items()))
+
+def _add(lin1, lin2, c):
+    terms = dict(lin1[1])
+    for (f, x) in lin2[1].items():
+        terms[f] = terms.get(f, 0.0) + x * c
+    return (lin1[0] + lin2[0] * c, terms)
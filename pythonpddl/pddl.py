@@ -6,9 +6,31 @@ from pythonpddl import pddlLexer
 from pythonpddl import pddlParser
 
 
+import fnmatch
+import gzip
+import io
 import itertools
+from collections import OrderedDict
+import os
 import sys
+import tarfile
 
+try:
+    import lzma
+except ImportError:
+    lzma = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+if hasattr(os, "PathLike"):
+    _PATH_TYPES = (str, os.PathLike)
+    _fspath = os.fspath
+else:
+    _PATH_TYPES = (str,)
+    _fspath = str
 
 
 class TypedArg:
@@ -611,7 +633,118 @@ class Problem:
             ret = ret + "\t" + self.metric.asPDDL() + "\n"
         ret = ret + ")"
         return ret
-        
+
+    def variant(self, name = None):
+        """ returns a ProblemVariant which shares the objects and initial state of this problem"""
+        return ProblemVariant(self, name)
+
+    def _pddl_cache(self):
+        """ returns the PDDL of each object and initial state element, computed once.
+        The problem must not be modified after this has been called"""
+        if getattr(self, "_cache", None) is None:
+            objects = [(o.arg_name, o.asPDDL()) for o in self.objects.args]
+            init = [x.asPDDL() for x in self.initialstate]
+            init_index = {}
+            for (i, x) in enumerate(init):
+                init_index.setdefault(x, i)
+            self._cache = (objects, set(o[0] for o in objects), init, init_index)
+        return self._cache
+
+
+class ProblemVariant:
+    """ represents a problem derived from a base Problem. The objects and initial state of the base are shared,
+    and the variant only stores the objects and initial state elements it adds or removes, so creating a
+    variant costs time and memory proportional to the change. The base must not be modified while it has variants"""
+    def __init__(self, base, name = None, goal = None, metric = None):
+        self.base = base
+        self.name = name if name is not None else base.name
+        self.domainname = base.domainname
+        self.goal = goal if goal is not None else base.goal
+        self.metric = metric if metric is not None else base.metric
+        self.added_objects = OrderedDict()  # from name to TypedArg
+        self.removed_objects = set()        # names of base objects
+        self.added_init = OrderedDict()     # from PDDL string to initial state element
+        self.removed_init = set()           # indices in base.initialstate
+
+    def variant(self, name = None):
+        """ returns a copy of this variant, sharing the same base"""
+        v = ProblemVariant(self.base, name if name is not None else self.name, self.goal, self.metric)
+        v.added_objects = OrderedDict(self.added_objects)
+        v.removed_objects = set(self.removed_objects)
+        v.added_init = OrderedDict(self.added_init)
+        v.removed_init = set(self.removed_init)
+        return v
+
+    def add_object(self, name, arg_type = None):
+        """ adds an object, unless it is already present"""
+        self.removed_objects.discard(name)
+        if name not in self.base._pddl_cache()[1] and name not in self.added_objects:
+            self.added_objects[name] = TypedArg(name, arg_type)
+
+    def remove_object(self, name):
+        """ removes an object. Initial state elements and goals which mention it are not removed"""
+        if name in self.added_objects:
+            del self.added_objects[name]
+        elif name in self.base._pddl_cache()[1] and name not in self.removed_objects:
+            self.removed_objects.add(name)
+        else:
+            raise Exception("No object " + name)
+
+    def add_init(self, initel):
+        """ adds an initial state element, unless it is already present"""
+        key = initel.asPDDL()
+        i = self.base._pddl_cache()[3].get(key)
+        if i is not None:
+            self.removed_init.discard(i)
+        elif key not in self.added_init:
+            self.added_init[key] = initel
+
+    def remove_init(self, initel):
+        key = initel.asPDDL()
+        i = self.base._pddl_cache()[3].get(key)
+        if key in self.added_init:
+            del self.added_init[key]
+        elif i is not None and i not in self.removed_init:
+            self.removed_init.add(i)
+        else:
+            raise Exception("No initial state element " + key)
+
+    @property
+    def objects(self):
+        return TypedArgList([o for o in self.base.objects.args if o.arg_name not in self.removed_objects] +
+                            list(self.added_objects.values()))
+
+    @property
+    def initialstate(self):
+        return [x for (i, x) in enumerate(self.base.initialstate) if i not in self.removed_init] + \
+            list(self.added_init.values())
+
+    def _pddl_chunks(self):
+        (objects, _, init, _) = self.base._pddl_cache()
+        yield "(define (problem " + self.name + ")\n"
+        yield "\t(:domain " + self.domainname + ")\n"
+        yield "\t(:objects " + " ".join([s for (name, s) in objects if name not in self.removed_objects] +
+                                       [o.asPDDL() for o in self.added_objects.values()]) + ")\n"
+        yield "\t(:init \n"
+        for (i, s) in enumerate(init):
+            if i not in self.removed_init:
+                yield "\t\t" + s + "\n"
+        for s in self.added_init:
+            yield "\t\t" + s + "\n"
+        yield "\t)\n"
+        yield "\t(:goal " + self.goal.asPDDL() + ")\n"
+        if self.metric is not None:
+            yield "\t" + self.metric.asPDDL() + "\n"
+        yield ")"
+
+    def writePDDL(self, out):
+        """ writes the problem to a file object, streaming the cached PDDL of the base together with the changes"""
+        for chunk in self._pddl_chunks():
+            out.write(chunk)
+
+    def asPDDL(self):
+        return "".join(self._pddl_chunks())
+
 def parseNameLiteral(nameLiteral):
     name = nameLiteral.atomicNameFormula().predicate().name().getText()
     terms = []
@@ -662,29 +795,115 @@ def parseProblem(problem):
 
     return Problem(name, domain, objects, init, goal, metric)
 
+class _PrefixedReader:
+    """ a binary file object which returns the given prefix before the rest of another file object"""
+    def __init__(self, prefix, f):
+        self.prefix = prefix
+        self.f = f
+
+    def read(self, size = -1):
+        if size is None or size < 0:
+            ret = self.prefix + self.f.read()
+            self.prefix = b""
+            return ret
+        ret = self.prefix[:size]
+        self.prefix = self.prefix[size:]
+        if len(ret) < size:
+            ret = ret + self.f.read(size - len(ret))
+        return ret
+
+    def readable(self):
+        return True
+
+def openDecompressed(f):
+    """ returns a binary file object which decompresses f (gzip, bzip2, xz or zstd, detected by magic number),
+    or which reads f as is if it is not compressed"""
+    head = f.read(6)
+    f = _PrefixedReader(head, f)
+    if head.startswith(b"\x1f\x8b"):
+        return gzip.GzipFile(fileobj=f)
+    elif head.startswith(b"BZh"):
+        import bz2
+        return bz2.BZ2File(f)
+    elif head.startswith(b"\xfd7zXZ\x00"):
+        if lzma is None:
+            raise Exception("Can't read xz compressed input without the lzma module")
+        return lzma.LZMAFile(f)
+    elif head.startswith(b"\x28\xb5\x2f\xfd"):
+        if zstandard is None:
+            raise Exception("Can't read zstd compressed input without the zstandard module")
+        return zstandard.ZstdDecompressor().stream_reader(f)
+    return f
+
+def readInput(source):
+    """ returns the text of a PDDL input, which is either a path (a str or os.PathLike), an open file object, or the
+    contents as bytes. Compressed inputs are decompressed in memory while they are read"""
+    if isinstance(source, _PATH_TYPES):
+        with open(_fspath(source), "rb") as f:
+            return readInput(f)
+    elif isinstance(source, bytes):
+        return readInput(io.BytesIO(source))
+    head = source.read(6)
+    if not isinstance(head, bytes):
+        return head + source.read()
+    return openDecompressed(_PrefixedReader(head, source)).read().decode("utf-8")
+
+def sourceName(source):
+    """ returns a name for a PDDL input, to be used in messages"""
+    if isinstance(source, _PATH_TYPES):
+        return _fspath(source)
+    return getattr(source, "name", "<" + type(source).__name__ + ">")
+
+def iterBundle(source, pattern = "*"):
+    """ yields (member name, text) for each file in a tar bundle whose name matches pattern, without extracting it.
+    The bundle and its members may be compressed. The bundle is given as in readInput"""
+    if isinstance(source, _PATH_TYPES):
+        f = open(_fspath(source), "rb")
+    elif isinstance(source, bytes):
+        f = io.BytesIO(source)
+    else:
+        f = source
+    try:
+        tar = tarfile.open(fileobj=openDecompressed(f), mode="r|")
+        for member in tar:
+            if member.isfile() and fnmatch.fnmatch(member.name, pattern):
+                yield (member.name, readInput(tar.extractfile(member)))
+    finally:
+        if f is not source:
+            f.close()
+
 def readAndParseFile(file):
-    inp = FileStream(file)
+    """ returns a parser for a PDDL input, given as in readInput"""
+    inp = InputStream(readInput(file))
     lexer = pddlLexer.pddlLexer(inp)
     stream = CommonTokenStream(lexer)
     parser = pddlParser.pddlParser(stream)
     return parser
 
+def parseProblemBundle(bundle, pattern = "*"):
+    """ yields (member name, Problem) for each problem in a tar bundle whose name matches pattern"""
+    for (name, text) in iterBundle(bundle, pattern):
+        problem = readAndParseFile(io.StringIO(text)).problem()
+        if problem is None:
+            raise Exception("No problem defined in " + name)
+        yield (name, parseProblem(problem))
+
 def parseDomainAndProblem(domainfile, problemfile):
-    print("Parsing domain", domainfile)
+    print("Parsing domain", sourceName(domainfile))
     dtree = readAndParseFile(domainfile)
     domain = dtree.domain()
     if domain is not None:
         dom = parseDomain(domain)
     else:
-        raise Exception("No domain defined in " + domainfile)
+        raise Exception("No domain defined in " + sourceName(domainfile))
 
-    print("Parsing problem", problemfile)
+    print("Parsing problem", sourceName(problemfile))
     ptree = readAndParseFile(problemfile)
     problem = ptree.problem()
     if problem is not None:
         prob = parseProblem(problem)
     else:
-        raise Exception("No problem defined in " + problemfile)
+        raise Exception("No problem defined in " + sourceName(problemfile))
 
 
     return (dom, prob)
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+""" successor generator: a decision tree over the preconditions of ground operators.
+
+Each node switches on one fact variable: operators whose next precondition is on that variable
+are stored below the child for the required value, all others below the don't-care child.
+Operators whose preconditions have all been tested are stored at the node. Looking up a state
+only descends into children which agree with it, so its cost is proportional to the number of
+nodes on matching paths rather than to the number of operators.
+
+Without a SASTask, each ground atom is a binary variable which is tested for being true. Given
+a SASTask (see invariants.translate), atoms are mapped to its variables, and states are lists of
+variable values. Only positive propositional preconditions are indexed: the result holds every
+applicable operator, but negative and numeric preconditions still have to be checked.
+
+The tree is stored in flat lists, so it can be pickled regardless of its depth.
+"""
+
+
+class SuccessorGenerator:
+    """ represents a decision tree over the preconditions of a list of GroundActions"""
+    def __init__(self, operators, task=None):
+        self.sas = task is not None
+        self.node_var = []           # variable tested at each node (None for leaves)
+        self.node_children = []      # dict from value to child node
+        self.node_dont_care = []     # child node for operators not conditioned on the variable, or -1
+        self.node_immediate = []     # ids of operators whose preconditions have all been tested
+
+        self.atoms = []              # atom of each binary variable
+        if task is not None:
+            facts = task.fact_index
+        else:
+            facts = {}
+            for op in operators:
+                for atom in op.pre_pos:
+                    if atom not in facts:
+                        facts[atom] = (len(self.atoms), True)
+                        self.atoms.append(atom)
+
+        self._build(sorted((sorted(set(facts[a] for a in op.pre_pos if a in facts)), i)
+                           for (i, op) in enumerate(operators)))
+
+    def _new_node(self):
+        self.node_var.append(None)
+        self.node_children.append({})
+        self.node_dont_care.append(-1)
+        self.node_immediate.append([])
+        return len(self.node_var) - 1
+
+    def _build(self, conds):
+        """ builds the tree in one pass over the sorted precondition lists. The operators below a node share
+        their first depth preconditions, so they form a contiguous range, and so do its children"""
+        stack = [(self._new_node(), 0, len(conds), 0)]
+        while stack:
+            (node, lo, hi, depth) = stack.pop()
+            while lo < hi and len(conds[lo][0]) == depth:
+                self.node_immediate[node].append(conds[lo][1])
+                lo = lo + 1
+            if lo == hi:
+                continue
+            var = conds[lo][0][depth][0]
+            self.node_var[node] = var
+            while lo < hi and conds[lo][0][depth][0] == var:
+                fact = conds[lo][0][depth]
+                start = lo
+                while lo < hi and conds[lo][0][depth] == fact:
+                    lo = lo + 1
+                child = self._new_node()
+                self.node_children[node][fact[1]] = child
+                stack.append((child, start, lo, depth + 1))
+            if lo < hi:
+                child = self._new_node()
+                self.node_dont_care[node] = child
+                stack.append((child, lo, hi, depth))
+
+    def get_applicable_ids(self, state):
+        """ returns the ids (indices in the operator list) of the operators whose positive preconditions hold in state,
+        which is a set of true atoms, or a list of variable values if the generator was built from a SASTask"""
+        result = []
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            result.extend(self.node_immediate[node])
+            var = self.node_var[node]
+            if var is None:
+                continue
+            if self.node_dont_care[node] >= 0:
+                stack.append(self.node_dont_care[node])
+            if self.sas:
+                child = self.node_children[node].get(state[var])
+            else:
+                child = self.node_children[node].get(self.atoms[var] in state)
+            if child is not None:
+                stack.append(child)
+        return result
+
+    def num_nodes(self):
+        return len(self.node_var)
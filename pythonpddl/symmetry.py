@@ -0,0 +1,230 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+""" object symmetry detection.
+
+Two objects of the same type are interchangeable if swapping them maps the initial state (facts,
+timed initial literals and numeric values), the goal and the metric onto themselves. Objects named
+in the domain (constants) are never interchangeable. Since action schemas only mention constants,
+such a swap is a symmetry of the whole task, and if swapping a with b and b with c are symmetries
+then so is swapping a with c, so the interchangeable objects form equivalence classes, and any
+permutation within the classes maps states to symmetric states, with the same distance to the goal.
+
+ObjectSymmetry uses the classes to group ground operators into orbits, to keep one applicable
+operator per orbit under the permutations which fix a state, and to map states to a canonical
+representative, which search can use for duplicate detection. All ground operators are still
+needed, since states reached by search are usually less symmetric than the initial state: pruning
+only happens at search time, with prune_applicable. In domains with numeric effects the
+numeric state changes during search, so a state is only fixed by a permutation if its numeric values
+are too: the values (a dict from ground fluent to value, e.g. dict(zip(store.fluents, row)) for a
+row of a numeric.NumericStore batch) must then be passed to stabilizer, prune_applicable and
+canonical_state, otherwise they are ignored.
+"""
+
+from collections import deque
+
+from pythonpddl.grounding import atomOf, goalAtoms, groundActions, initialAtoms, instantiate, numericConditions
+from pythonpddl.pddl import FExpression, TimedFormula
+from pythonpddl.successors import SuccessorGenerator
+
+
+def _swapAtom(atom, a, b):
+    return (atom[0],) + tuple(b if x == a else (a if x == b else x) for x in atom[1:])
+
+def _index(atoms):
+    """ returns a dict from each object to the atoms in which it appears"""
+    by_object = {}
+    for atom in atoms:
+        for x in set(atom[1:]):
+            by_object.setdefault(x, []).append(atom)
+    return by_object
+
+def _swapInvariant(a, b, atoms, by_object):
+    """ checks whether swapping objects a and b maps a set of atoms onto itself"""
+    for atom in by_object.get(a, []) + by_object.get(b, []):
+        if _swapAtom(atom, a, b) not in atoms:
+            return False
+    return True
+
+def _numericAtoms(values):
+    """ returns the defined numeric values of a dict from ground fluent to value, as atoms whose predicate names
+    the function and the value, so that they can be swapped, indexed and sorted like other atoms"""
+    if not values:
+        return []
+    return [("=" + f[0] + " " + repr(float(v)),) + tuple(f[1:]) for (f, v) in values.items() if v == v]
+
+def _partition(objects, key, equivalent):
+    """ returns the classes of an equivalence relation, comparing each object to one representative per class
+    among the objects with the same key"""
+    classes = []
+    reps = {}
+    for o in objects:
+        for c in reps.setdefault(key(o), []):
+            if equivalent(classes[c][0], o):
+                classes[c].append(o)
+                break
+        else:
+            reps[key(o)].append(len(classes))
+            classes.append([o])
+    return classes
+
+
+class ObjectSymmetry:
+    """ represents classes of interchangeable objects (objects not in any class are only symmetric to themselves)"""
+    def __init__(self, classes):
+        self.classes = [sorted(c) for c in classes if len(c) > 1]
+        self.class_of = {}
+        for (i, c) in enumerate(self.classes):
+            for o in c:
+                self.class_of[o] = i
+
+    def canonical_args(self, args):
+        """ returns the canonical representative of a tuple of objects: within each class, objects are renamed to
+        the first members of the class in order of first appearance"""
+        renaming = {}
+        used = [0] * len(self.classes)
+        ret = []
+        for x in args:
+            c = self.class_of.get(x)
+            if c is None:
+                ret.append(x)
+                continue
+            if x not in renaming:
+                renaming[x] = self.classes[c][used[c]]
+                used[c] = used[c] + 1
+            ret.append(renaming[x])
+        return tuple(ret)
+
+    def operator_orbits(self, operators):
+        """ returns a dict from canonical (schema name, args) to the list of ids of the operators in that orbit"""
+        orbits = {}
+        for (i, op) in enumerate(operators):
+            orbits.setdefault((op.schema.name, self.canonical_args(op.args)), []).append(i)
+        return orbits
+
+    def stabilizer(self, state, values = None):
+        """ returns the ObjectSymmetry of the swaps which also fix a set of atoms and, if given, numeric values"""
+        state = frozenset(state) | frozenset(_numericAtoms(values))
+        by_object = _index(state)
+        classes = []
+        for c in self.classes:
+            classes = classes + _partition(c, lambda o: len(by_object.get(o, [])),
+                                           lambda a, b: _swapInvariant(a, b, state, by_object))
+        return ObjectSymmetry(classes)
+
+    def prune_applicable(self, operators, ids, state, values = None):
+        """ returns the subset of operator ids (e.g., the applicable operators in state) with one operator per orbit
+        under the permutations which fix state (and values)"""
+        orbits = self.stabilizer(state, values).operator_orbits([operators[i] for i in ids])
+        return sorted(ids[l[0]] for l in orbits.values())
+
+    def canonical_state(self, state, values = None):
+        """ returns a state symmetric to state, as a frozenset. Within each class, objects are renamed in order of
+        the (sorted) atoms they appear in, so symmetric states usually, but not always, get the same representative.
+        If values is given, returns a pair of the frozenset and a frozenset of the renamed (fluent, value) items"""
+        numeric = _numericAtoms(values)
+        by_object = _index(list(state) + numeric)
+        renaming = {}
+        for c in self.classes:
+            sig = lambda o: sorted(tuple("*" if x == o else x for x in atom) for atom in by_object.get(o, []))
+            for (o, new) in zip(sorted(c, key=lambda o: (sig(o), o)), c):
+                renaming[o] = new
+        rename = lambda atom: (atom[0],) + tuple(renaming.get(x, x) for x in atom[1:])
+        if values is None:
+            return frozenset(rename(atom) for atom in state)
+        return (frozenset(rename(atom) for atom in state), frozenset((rename(f), v) for (f, v) in values.items() if v == v))
+
+    def num_symmetric_objects(self):
+        return sum(len(c) for c in self.classes)
+
+
+def findSymmetries(domain, problem):
+    """ returns the ObjectSymmetry of the interchangeable objects of a problem"""
+    facts = initialAtoms(problem)
+    tils = set()
+    nums = {}
+    for initel in problem.initialstate:
+        if isinstance(initel, TimedFormula):
+            tils.add((initel.timespecifier, atomOf(initel.formula), initel.formula.op != "not"))
+        elif isinstance(initel, FExpression) and initel.op == "=":
+            nums[atomOf(initel.subexps[0])] = initel.subexps[1].val
+    goal_pos = set(goalAtoms(problem, True))
+    goal_neg = set(goalAtoms(problem, False))
+    numeric_goal = numericConditions(problem.goal)
+    if problem.metric is not None:
+        numeric_goal = numeric_goal + [problem.metric.fexp]
+
+    facts_by = _index(facts)
+    til_by = {}
+    for (t, atom, v) in tils:
+        for x in set(atom[1:]):
+            til_by.setdefault(x, []).append((t, atom, v))
+    nums_by = _index(nums)
+    pos_by = _index(goal_pos)
+    neg_by = _index(goal_neg)
+    numeric_pddl = set(x.asPDDL() for x in numeric_goal)
+
+    def equivalent(a, b):
+        if not (_swapInvariant(a, b, facts, facts_by) and _swapInvariant(a, b, goal_pos, pos_by) and
+                _swapInvariant(a, b, goal_neg, neg_by)):
+            return False
+        for (t, atom, v) in til_by.get(a, []) + til_by.get(b, []):
+            if (t, _swapAtom(atom, a, b), v) not in tils:
+                return False
+        for f in nums_by.get(a, []) + nums_by.get(b, []):
+            if nums.get(_swapAtom(f, a, b)) != nums[f]:
+                return False
+        if numeric_goal:
+            swapped = set(instantiate(x, {a: b, b: a}).asPDDL() for x in numeric_goal)
+            if swapped != numeric_pddl:
+                return False
+        return True
+
+    constants = set(c.arg_name for c in domain.constants.args)
+    objects = [o for o in problem.objects.args if o.arg_name not in constants]
+    types = dict((o.arg_name, o.arg_type) for o in objects)
+    def profile(o):
+        return (types[o], len(facts_by.get(o, [])), len(pos_by.get(o, [])), len(neg_by.get(o, [])),
+                len(til_by.get(o, [])), len(nums_by.get(o, [])))
+    return ObjectSymmetry(_partition([o.arg_name for o in objects], profile, equivalent))
+
+
+def _explore(operators, init, max_states, canonical=None):
+    """ returns the number of states expanded by breadth-first search from init, up to max_states (None for no limit)"""
+    generator = SuccessorGenerator(operators)
+    start = frozenset(init) if canonical is None else canonical(init)
+    seen = set([start])
+    queue = deque([start])
+    expanded = 0
+    while queue and (max_states is None or expanded < max_states):
+        state = queue.popleft()
+        expanded = expanded + 1
+        for i in generator.get_applicable_ids(state):
+            if not operators[i].is_applicable(state):
+                continue
+            succ = operators[i].apply(state)
+            if canonical is not None:
+                succ = canonical(succ)
+            if succ not in seen:
+                seen.add(succ)
+                queue.append(succ)
+    return expanded
+
+def symmetryReport(domain, problem, max_states=10000):
+    """ returns a summary of the symmetries of a problem: the object classes, the number of ground operator orbits,
+    and the number of states expanded by breadth-first search (propositional part only, up to max_states, or
+    all reachable states if it is None),
+    without and with canonical states"""
+    symmetry = findSymmetries(domain, problem)
+    operators = groundActions(domain, problem)
+    init = initialAtoms(problem)
+    ret = str(len(symmetry.classes)) + " classes of interchangeable objects, with " + \
+        str(symmetry.num_symmetric_objects()) + " objects\n"
+    for c in symmetry.classes:
+        ret = ret + "\t" + " ".join(c) + "\n"
+    ret = ret + str(len(operators)) + " ground operators in " + str(len(symmetry.operator_orbits(operators))) + " orbits\n"
+    ret = ret + str(_explore(operators, init, max_states)) + " states expanded, " + \
+        str(_explore(operators, init, max_states, symmetry.canonical_state)) + " with canonical states"
+    if max_states is not None:
+        ret = ret + " (at most " + str(max_states) + ")"
+    return ret
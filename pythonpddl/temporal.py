@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+""" precompiled structures for temporal problems.
+
+Timeline holds the timed initial literals of a problem as a sorted event array, so that the
+state at time t, the next event after t, and the events between two times are found by binary
+search. SnapActions holds the start, invariant (over all) and end parts of a durative action,
+split by time specifier once, instead of filtering its conditions and effects on every call.
+"""
+
+from bisect import bisect_right
+
+from pythonpddl.grounding import atomOf, initialAtoms, instantiate, numericConditions, numericEffects
+from pythonpddl.pddl import TimedFormula
+
+
+class Timeline:
+    """ represents the timed initial literals of a problem, sorted by time. A literal at time t holds from t on,
+    and literals at the same time are applied in the order of the problem file"""
+    def __init__(self, problem):
+        events = []
+        for initel in problem.initialstate:
+            if isinstance(initel, TimedFormula):
+                events.append((float(initel.timespecifier), atomOf(initel.formula), initel.formula.op != "not"))
+        events.sort(key=lambda e: e[0])
+        self.initial = frozenset(initialAtoms(problem))
+        self.times = [e[0] for e in events]
+        self.atoms = [e[1] for e in events]
+        self.values = [e[2] for e in events]
+        self.atom_times = {}            # for each atom, the times of its events
+        self.atom_values = {}           # and its value after each of them
+        for (t, atom, value) in events:
+            self.atom_times.setdefault(atom, []).append(t)
+            self.atom_values.setdefault(atom, []).append(value)
+
+    def __len__(self):
+        return len(self.times)
+
+    def holds_at(self, atom, t):
+        """ returns whether atom holds at time t, if no action changes it"""
+        times = self.atom_times.get(atom)
+        if times is None:
+            return atom in self.initial
+        i = bisect_right(times, t)
+        if i == 0:
+            return atom in self.initial
+        return self.atom_values[atom][i - 1]
+
+    def state_at(self, t):
+        """ returns the set of atoms which hold at time t, if no action is applied. The events up to t are found by
+        binary search, and applied in order, so this costs time proportional to their number"""
+        state = set(self.initial)
+        j = bisect_right(self.times, t)
+        for (atom, value) in zip(self.atoms[:j], self.values[:j]):
+            if value:
+                state.add(atom)
+            else:
+                state.discard(atom)
+        return state
+
+    def next_time(self, t):
+        """ returns the time of the first event after t, or None if there is none"""
+        i = bisect_right(self.times, t)
+        if i == len(self.times):
+            return None
+        return self.times[i]
+
+    def events_between(self, t0, t1):
+        """ returns the list of (time, atom, value) events with t0 < time <= t1, in order"""
+        i = bisect_right(self.times, t0)
+        j = bisect_right(self.times, t1)
+        return list(zip(self.times[i:j], self.atoms[i:j], self.values[i:j]))
+
+    def apply_events(self, state, t0, t1):
+        """ returns a copy of state with the events between t0 (exclusive) and t1 (inclusive) applied"""
+        state = set(state)
+        for (_, atom, value) in self.events_between(t0, t1):
+            if value:
+                state.add(atom)
+            else:
+                state.discard(atom)
+        return state
+
+
+class Snap:
+    """ represents one part (start, invariant or end) of a durative action"""
+    def __init__(self, pre_pos, pre_neg, add_eff, del_eff, num_pre, num_eff):
+        self.pre_pos = pre_pos          # lists of atoms
+        self.pre_neg = pre_neg
+        self.add_eff = add_eff
+        self.del_eff = del_eff
+        self.num_pre = num_pre          # lists of numeric Formulas
+        self.num_eff = num_eff
+
+    def is_applicable(self, state):
+        """ checks the propositional conditions against a set of true atoms"""
+        return all(a in state for a in self.pre_pos) and not any(a in state for a in self.pre_neg)
+
+    def apply(self, state):
+        """ returns the set of atoms which are true after applying this snap action to state"""
+        return (frozenset(state) - frozenset(self.del_eff)) | frozenset(self.add_eff)
+
+
+def _snap(da, timespecifier, binding):
+    cond = [x.formula for x in da.cond if x.timespecifier == timespecifier]
+    eff = [x.formula for x in da.eff if x.timespecifier == timespecifier]
+    pre_pos = []
+    pre_neg = []
+    num_pre = []
+    for f in cond:
+        pre_pos = pre_pos + [atomOf(p, binding) for p in f.get_predicates(True)]
+        pre_neg = pre_neg + [atomOf(p, binding) for p in f.get_predicates(False)]
+        num_pre = num_pre + numericConditions(f)
+    add_eff = []
+    del_eff = []
+    for f in eff:
+        add_eff = add_eff + [atomOf(p, binding) for p in f.get_predicates(True)]
+        del_eff = del_eff + [atomOf(p, binding) for p in f.get_predicates(False)]
+    num_eff = numericEffects(eff)
+    if binding:
+        num_pre = [instantiate(x, binding) for x in num_pre]
+        num_eff = [instantiate(x, binding) for x in num_eff]
+    return Snap(pre_pos, pre_neg, add_eff, del_eff, num_pre, num_eff)
+
+class SnapActions:
+    """ represents the start, invariant and end snap actions of a DurativeAction, lifted or for a binding of its
+    parameters. The invariant has no effects"""
+    def __init__(self, da, args = None):
+        self.action = da
+        self.args = args
+        binding = {}
+        if args is not None:
+            binding = dict(zip([a.arg_name for a in da.parameters.args], args))
+        self.start = _snap(da, "start", binding)
+        self.invariant = _snap(da, "all", binding)
+        self.end = _snap(da, "end", binding)
+
+    def ground(self, args):
+        """ returns the snap actions for a tuple of objects, one per parameter (e.g., the args of a GroundAction)"""
+        return SnapActions(self.action, tuple(args))
+
+def snapActions(domain):
+    """ returns a dict from the name of each durative action of a domain to its lifted SnapActions"""
+    return dict((da.name, SnapActions(da)) for da in domain.durative_actions)
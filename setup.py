@@ -86,6 +86,8 @@ setup(
     # for example:
     # $ pip install -e .[dev,test]
     extras_require={
+        'numeric': ['numpy'],
+        'zstd': ['zstandard'],
     },
 
     # If there are data files included in your packages that need to be
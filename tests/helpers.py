@@ -0,0 +1,63 @@
+""" builders for the small domains and problems used by the tests"""
+
+import random
+
+from pythonpddl.pddl import Action, Domain, FHead, Formula, Predicate, Problem, TypedArg, TypedArgList
+
+
+def typed(names, arg_type):
+    return [TypedArg(n, arg_type) for n in names]
+
+def atom(name, *args):
+    return Formula([Predicate(name, TypedArgList([TypedArg(a) for a in args]))])
+
+def negated_effect(name, *args):
+    return Formula([Predicate(name, TypedArgList([TypedArg(a) for a in args]))], "not", is_effect=True)
+
+def fhead(name, *args):
+    return FHead(name, TypedArgList([TypedArg(a) for a in args]))
+
+def conjunction(*formulas):
+    return Formula(list(formulas), "and")
+
+
+def logistics_domain():
+    """ trucks drive along roads and carry packages: (at ?t ?l) for trucks, (pat ?p ?l) and (in ?p ?t) for packages"""
+    types = TypedArgList(typed(["truck", "package", "location"], None))
+    predicates = [Predicate("at", TypedArgList(typed(["?t"], "truck") + typed(["?l"], "location"))),
+                  Predicate("pat", TypedArgList(typed(["?p"], "package") + typed(["?l"], "location"))),
+                  Predicate("in", TypedArgList(typed(["?p"], "package") + typed(["?t"], "truck"))),
+                  Predicate("road", TypedArgList(typed(["?a", "?b"], "location")))]
+    drive = Action("drive", TypedArgList(typed(["?t"], "truck") + typed(["?a", "?b"], "location")),
+                   conjunction(atom("at", "?t", "?a"), atom("road", "?a", "?b")),
+                   [atom("at", "?t", "?b"), negated_effect("at", "?t", "?a")])
+    load_params = TypedArgList(typed(["?p"], "package") + typed(["?t"], "truck") + typed(["?l"], "location"))
+    load = Action("load", load_params, conjunction(atom("at", "?t", "?l"), atom("pat", "?p", "?l")),
+                  [atom("in", "?p", "?t"), negated_effect("pat", "?p", "?l")])
+    unload = Action("unload", load_params, conjunction(atom("at", "?t", "?l"), atom("in", "?p", "?t")),
+                    [atom("pat", "?p", "?l"), negated_effect("in", "?p", "?t")])
+    return Domain("logistics", [], types, TypedArgList([]), predicates, [], [drive, load, unload], [])
+
+def logistics_problem(trucks=2, locations=3, packages=2):
+    """ locations on a two-way ring, all trucks at l0, package i at location i and to be delivered to location i + 1"""
+    ts = ["t" + str(i) for i in range(trucks)]
+    ls = ["l" + str(i) for i in range(locations)]
+    ps = ["p" + str(i) for i in range(packages)]
+    objects = TypedArgList(typed(ts, "truck") + typed(ps, "package") + typed(ls, "location"))
+    init = [atom("at", t, ls[0]) for t in ts] + \
+        [atom("pat", p, ls[i % locations]) for (i, p) in enumerate(ps)]
+    for i in range(locations):
+        init = init + [atom("road", ls[i], ls[(i + 1) % locations]), atom("road", ls[(i + 1) % locations], ls[i])]
+    goal = conjunction(*[atom("pat", p, ls[(i + 1) % locations]) for (i, p) in enumerate(ps)])
+    return Problem("delivery", "logistics", objects, init, goal)
+
+
+def random_states(operators, init, steps=200):
+    """ returns the states of a random walk from init (with a fixed seed), init included"""
+    rng = random.Random(0)
+    state = frozenset(init)
+    states = [state]
+    for _ in range(steps):
+        state = rng.choice([op for op in operators if op.is_applicable(state)]).apply(state)
+        states.append(state)
+    return states
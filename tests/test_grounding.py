@@ -0,0 +1,23 @@
+from pythonpddl import grounding
+
+from helpers import logistics_domain, logistics_problem
+
+
+def test_parallel_grounding_matches_sequential():
+    (domain, problem) = (logistics_domain(), logistics_problem(trucks=3, locations=5, packages=4))
+    sequential = grounding.groundActions(domain, problem)
+    parallel = grounding.groundActions(domain, problem, workers=4)
+    assert len(sequential) == 3 * 10 + 2 * 4 * 3 * 5
+    assert [op.asPDDL() for op in parallel] == [op.asPDDL() for op in sequential]
+    assert [(op.pre_pos, op.pre_neg, op.add_eff, op.del_eff) for op in parallel] == \
+        [(op.pre_pos, op.pre_neg, op.add_eff, op.del_eff) for op in sequential]
+
+def test_estimated_join_size_uses_static_selectivity():
+    (domain, problem) = (logistics_domain(), logistics_problem(trucks=3, locations=5, packages=4))
+    objs = grounding.objectsByType(domain, problem)
+    init = grounding.initialAtoms(problem)
+    fluents = grounding.fluentPredicates(domain)
+    drive = domain.actions[0]
+    # 3 trucks * 5 * 5 locations, of which 10 of 25 pairs are roads
+    assert grounding.estimateJoinSize(drive, objs, init, fluents) == 30.0
+    assert grounding.estimateJoinSize(drive, objs, init, fluents, ["t0"], grounding.predicateCounts(init)) == 10.0
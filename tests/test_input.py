@@ -0,0 +1,65 @@
+import bz2
+import gzip
+import io
+import lzma
+import tarfile
+
+import pytest
+
+from pythonpddl.pddl import iterBundle, readInput, sourceName
+
+
+TEXT = "(define (problem p)\n\t(:domain d)\n)\n"
+
+def gzipped(data):
+    out = io.BytesIO()
+    with gzip.GzipFile(fileobj=out, mode="wb") as f:
+        f.write(data)
+    return out.getvalue()
+
+def bundle(members, compress):
+    """ returns a tar of (name, bytes) members, compressed by compress"""
+    out = io.BytesIO()
+    with tarfile.open(fileobj=out, mode="w") as tar:
+        for (name, data) in members:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    return compress(out.getvalue())
+
+
+@pytest.mark.parametrize("compress", [lambda b: b, gzipped, bz2.compress, lzma.compress])
+def test_compressed_input(compress):
+    data = compress(TEXT.encode("utf-8"))
+    assert readInput(data) == TEXT
+    assert readInput(io.BytesIO(data)) == TEXT
+
+def test_zstd_input():
+    zstandard = pytest.importorskip("zstandard")
+    assert readInput(zstandard.ZstdCompressor().compress(TEXT.encode("utf-8"))) == TEXT
+
+def test_multi_member_gzip():
+    assert readInput(gzipped(TEXT[:10].encode("utf-8")) + gzipped(TEXT[10:].encode("utf-8"))) == TEXT
+
+def test_short_and_text_inputs():
+    assert readInput(b"()") == "()"
+    assert readInput(io.StringIO(TEXT)) == TEXT
+
+def test_path_input(tmp_path):
+    path = tmp_path / "p.pddl.gz"
+    path.write_bytes(gzipped(TEXT.encode("utf-8")))
+    assert readInput(path) == TEXT
+    assert readInput(str(path)) == TEXT
+    assert sourceName(path) == str(path)
+    assert sourceName(io.BytesIO()) == "<BytesIO>"
+
+def test_compressed_bundle_with_compressed_members(tmp_path):
+    members = [("p1.pddl", TEXT.encode("utf-8")), ("p2.pddl.gz", gzipped(TEXT.encode("utf-8"))),
+               ("p3.pddl.bz2", bz2.compress(TEXT.encode("utf-8"))), ("README", b"not a problem")]
+    data = bundle(members, lzma.compress)
+    assert list(iterBundle(data, "*.pddl*")) == [("p1.pddl", TEXT), ("p2.pddl.gz", TEXT), ("p3.pddl.bz2", TEXT)]
+    path = tmp_path / "problems.tar.xz"
+    path.write_bytes(data)
+    assert [name for (name, _) in iterBundle(path)] == ["p1.pddl", "p2.pddl.gz", "p3.pddl.bz2", "README"]
+    with open(str(path), "rb") as f:
+        assert len(list(iterBundle(f, "p2*"))) == 1
@@ -0,0 +1,102 @@
+import pytest
+
+from pythonpddl.pddl import Domain, DurativeAction, Formula, Predicate, Problem, TimedFormula, TypedArgList, \
+    ConstantNumber
+from pythonpddl import grounding, invariants
+
+from helpers import atom, logistics_domain, logistics_problem, negated_effect, random_states, typed
+
+
+def move_domain(add_at, del_at):
+    """ a durative move which adds (at ?t ?b) at add_at and deletes (at ?t ?a) at del_at"""
+    at = Predicate("at", TypedArgList(typed(["?t"], "truck") + typed(["?l"], "location")))
+    move = DurativeAction("move", TypedArgList(typed(["?t"], "truck") + typed(["?a", "?b"], "location")),
+                          ConstantNumber(1.0), ConstantNumber(1.0),
+                          [TimedFormula("start", atom("at", "?t", "?a"))],
+                          [TimedFormula(add_at, atom("at", "?t", "?b")),
+                           TimedFormula(del_at, negated_effect("at", "?t", "?a"))])
+    types = TypedArgList(typed(["truck", "location"], None))
+    return Domain("move", [], types, TypedArgList([]), [at], [], [], [move])
+
+def move_problem():
+    objects = TypedArgList(typed(["t"], "truck") + typed(["a", "b"], "location"))
+    return Problem("p", "move", objects, [atom("at", "t", "a")], atom("at", "t", "b"))
+
+def at_invariants(domain):
+    return [inv for inv in invariants.synthesizeInvariants(domain) if "at" in inv.by_predicate]
+
+
+def test_add_at_start_delete_at_end_is_not_an_invariant():
+    # both atoms are true while the action runs
+    assert at_invariants(move_domain("start", "end")) == []
+
+def test_delete_at_start_add_at_end_is_not_exactly_one():
+    # no atom is true while the action runs
+    domain = move_domain("end", "start")
+    assert all(not inv.balanced for inv in at_invariants(domain))
+    task = invariants.translate(domain, move_problem())
+    for (v, val) in zip(task.variables, task.encode_state(set())):
+        assert val < v.domain_size()
+
+def test_static_goal_false_in_init_is_rejected():
+    problem = move_problem()
+    problem.initialstate.append(atom("road", "a", "b"))
+    problem.goal = Formula([atom("at", "t", "b"), atom("road", "a", "b")], "and")
+    assert len(invariants.translate(move_domain("start", "start"), problem).goal) == 1
+    problem.goal = Formula([atom("at", "t", "b"), atom("road", "b", "b")], "and")
+    with pytest.raises(Exception):
+        invariants.translate(move_domain("start", "start"), problem)
+
+def sas_applicable(op, state):
+    return all(state[var] == val for (var, val) in op.prevail) and \
+        all(pre == -1 or state[var] == pre for (_, var, pre, _) in op.pre_post)
+
+def sas_apply(op, state):
+    succ = list(state)
+    for (conds, var, _, post) in op.pre_post:
+        if all(state[v] == val for (v, val) in conds):
+            succ[var] = post
+    return succ
+
+def fluent(state):
+    return frozenset(a for a in state if a[0] != "road")
+
+
+def test_logistics_invariants():
+    found = invariants.synthesizeInvariants(logistics_domain())
+    assert sorted(str(inv) for inv in found) == ["{(at ?0 *)}", "{(in ?0 *), (pat ?0 *)}"]
+    assert all(inv.balanced for inv in found)
+
+def test_encode_decode_round_trip():
+    (domain, problem) = (logistics_domain(), logistics_problem())
+    task = invariants.translate(domain, problem)
+    for state in random_states(grounding.groundActions(domain, problem), grounding.initialAtoms(problem)):
+        assert task.decode_state(task.encode_state(state)) == fluent(state)
+
+def test_summary_sizes():
+    task = invariants.translate(logistics_domain(), logistics_problem())
+    # two trucks with 3 positions, two packages with 3 positions or 2 trucks
+    assert [v.domain_size() for v in task.variables] == [5, 5, 3, 3]
+    assert (task.sas_size(), task.binary_size()) == (10, 16)
+    assert task.summary() == "4 variables (4 multi-valued), 10 bits per state instead of 16 (62.5%)"
+
+def test_operators_match_ground_actions():
+    (domain, problem) = (logistics_domain(), logistics_problem())
+    operators = grounding.groundActions(domain, problem)
+    task = invariants.translate(domain, problem)
+    assert [op.name for op in task.operators] == [op.asPDDL()[1:-1] for op in operators]
+    for state in random_states(operators, grounding.initialAtoms(problem)):
+        values = task.encode_state(state)
+        for (op, sas_op) in zip(operators, task.operators):
+            assert sas_applicable(sas_op, values) == op.is_applicable(state)
+            if op.is_applicable(state):
+                assert task.decode_state(sas_apply(sas_op, values)) == fluent(op.apply(state))
+    assert "\nend_goal\n" + str(len(operators)) + "\nbegin_operator\n" in task.asSAS()
+
+def test_negative_goal_is_a_binary_variable():
+    problem = logistics_problem()
+    problem.goal = Formula([atom("pat", "p0", "l1"), Formula([atom("at", "t0", "l1")], "not")], "and")
+    task = invariants.translate(logistics_domain(), problem)
+    (var, val) = task.fact_index[("at", "t0", "l1")]
+    assert task.variables[var].atoms == [("at", "t0", "l1")]
+    assert (var, 1) in task.goal
@@ -0,0 +1,69 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from pythonpddl.pddl import Action, ConstantNumber, Domain, FExpression, Formula, Function, Problem, TypedArg, \
+    TypedArgList
+from pythonpddl import grounding, numeric
+
+from helpers import fhead
+
+
+def effect(op, head, exp):
+    return Formula([head, exp], op, is_effect=True, is_numeric=True)
+
+def move_problem(effects, pre=None, objects=("a",)):
+    """ a move action between two things, each of which has 10 fuel"""
+    params = TypedArgList([TypedArg("?x", "thing"), TypedArg("?y", "thing")])
+    move = Action("move", params, pre if pre is not None else Formula([], "and"), effects)
+    fuel = Function("fuel", TypedArgList([TypedArg("?t", "thing")]))
+    domain = Domain("d", [], TypedArgList([TypedArg("thing")]), TypedArgList([]), [], [fuel], [move], [])
+    init = [FExpression("=", [fhead("fuel", o), ConstantNumber(10.0)]) for o in objects]
+    problem = Problem("p", "d", TypedArgList([TypedArg(o, "thing") for o in objects]), init, Formula([], "and"))
+    return (domain, problem)
+
+def store_of(domain, problem):
+    ops = grounding.groundActions(domain, problem)
+    return (ops, numeric.NumericStore(problem, ops))
+
+
+def test_effects_on_the_same_fluent_add_up():
+    (domain, problem) = move_problem([
+        effect("decrease", fhead("fuel", "?x"), ConstantNumber(2.0)),
+        effect("increase", fhead("fuel", "?y"), FExpression("*", [ConstantNumber(0.5), fhead("fuel", "?x")]))])
+    (ops, store) = store_of(domain, problem)
+    assert [op.asPDDL() for op in ops] == ["(move a a)"]
+    assert store.apply(store.init, 0)[0, store.fluent_index[("fuel", "a")]] == 13.0
+
+def test_assign_and_increase_on_the_same_fluent_is_rejected():
+    (domain, problem) = move_problem([
+        effect("assign", fhead("fuel", "?x"), ConstantNumber(2.0)),
+        effect("increase", fhead("fuel", "?y"), ConstantNumber(1.0))])
+    with pytest.raises(Exception):
+        store_of(domain, problem)
+
+def test_assign_defines_an_undefined_fluent():
+    (domain, problem) = move_problem([effect("assign", fhead("level", "?x"), ConstantNumber(5.0))])
+    (ops, store) = store_of(domain, problem)
+    level = store.fluent_index[("level", "a")]
+    assert np.isnan(store.init[level])
+    assert store.apply(store.init, 0)[0, level] == 5.0
+
+def test_one_state_against_several_operators():
+    pre = Formula([fhead("fuel", "?x"), FExpression("+", [fhead("fuel", "?y"), ConstantNumber(1.0)])], ">")
+    (domain, problem) = move_problem([effect("decrease", fhead("fuel", "?x"), ConstantNumber(1.0))], pre, ("a", "b"))
+    (ops, store) = store_of(domain, problem)
+    state = store.init.copy()
+    state[store.fluent_index[("fuel", "a")]] = 12.0
+    assert [op.asPDDL() for op in ops] == ["(move a a)", "(move a b)", "(move b a)", "(move b b)"]
+    assert list(store.holds(state, [0, 1, 2, 3])) == [False, True, False, False]
+    assert list(store.holds(np.stack([state, store.init]), 1)) == [True, False]
+    assert store.apply(state, [0, 2])[:, store.fluent_index[("fuel", "a")]].tolist() == [11.0, 12.0]
+
+@pytest.mark.parametrize("eff", [
+    effect("scale-down", fhead("fuel", "?x"), ConstantNumber(0.0)),
+    effect("increase", fhead("fuel", "?x"), FExpression("/", [ConstantNumber(1.0), ConstantNumber(0.0)]))])
+def test_division_by_zero_is_rejected(eff):
+    (domain, problem) = move_problem([eff])
+    with pytest.raises(Exception, match="Can't compile"):
+        store_of(domain, problem)
@@ -0,0 +1,37 @@
+import pickle
+
+from pythonpddl import grounding, invariants
+from pythonpddl.successors import SuccessorGenerator
+
+from helpers import logistics_domain, logistics_problem, random_states
+
+
+def walk():
+    (domain, problem) = (logistics_domain(), logistics_problem(trucks=2, locations=4, packages=3))
+    operators = grounding.groundActions(domain, problem)
+    return (domain, problem, operators, random_states(operators, grounding.initialAtoms(problem)))
+
+
+def test_binary_lookup_finds_all_applicable_operators():
+    (_, _, operators, states) = walk()
+    generator = SuccessorGenerator(operators)
+    for state in states:
+        found = generator.get_applicable_ids(state)
+        assert len(found) == len(set(found))
+        assert set(found) >= set(i for (i, op) in enumerate(operators) if op.is_applicable(state))
+
+def test_sas_lookup_finds_all_applicable_operators():
+    (domain, problem, operators, states) = walk()
+    task = invariants.translate(domain, problem, operators=operators)
+    generator = SuccessorGenerator(operators, task)
+    for state in states:
+        found = generator.get_applicable_ids(task.encode_state(state))
+        assert set(found) >= set(i for (i, op) in enumerate(operators) if op.is_applicable(state))
+
+def test_pickle_round_trip():
+    (_, _, operators, states) = walk()
+    generator = SuccessorGenerator(operators)
+    copy = pickle.loads(pickle.dumps(generator))
+    assert copy.num_nodes() == generator.num_nodes()
+    for state in states:
+        assert copy.get_applicable_ids(state) == generator.get_applicable_ids(state)
@@ -0,0 +1,93 @@
+from collections import deque
+
+from pythonpddl.pddl import Action, ConstantNumber, Domain, FExpression, FHead, Formula, Function, Predicate, \
+    Problem, TypedArg, TypedArgList
+from pythonpddl import grounding, symmetry
+from pythonpddl.successors import SuccessorGenerator
+
+from helpers import atom, fhead, logistics_domain, logistics_problem
+
+
+def refuel_problem(trucks):
+    """ a refuel action for each of the given trucks, which are all ready and have the same fuel"""
+    params = TypedArgList([TypedArg("?t", "truck")])
+    refuel = Action("refuel", params, atom("ready", "?t"),
+                    [Formula([FHead("fuel", params), ConstantNumber(1.0)], "increase", is_effect=True, is_numeric=True)])
+    domain = Domain("d", [], TypedArgList([TypedArg("truck")]), TypedArgList([]),
+                    [Predicate("ready", params)], [Function("fuel", params)], [refuel], [])
+    init = [atom("ready", t) for t in trucks] + \
+        [FExpression("=", [fhead("fuel", t), ConstantNumber(10.0)]) for t in trucks]
+    objects = TypedArgList([TypedArg(t, "truck") for t in trucks])
+    return (domain, Problem("p", "d", objects, init, Formula([], "and")))
+
+
+def test_numeric_values_break_symmetry():
+    (domain, problem) = refuel_problem(["t1", "t2", "t3"])
+    sym = symmetry.findSymmetries(domain, problem)
+    assert sym.classes == [["t1", "t2", "t3"]]
+    ops = grounding.groundActions(domain, problem)
+    state = grounding.initialAtoms(problem)
+    assert len(sym.prune_applicable(ops, [0, 1, 2], state)) == 1
+    values = {("fuel", "t1"): 10.0, ("fuel", "t2"): 11.0, ("fuel", "t3"): 10.0}
+    assert len(sym.prune_applicable(ops, [0, 1, 2], state, values)) == 2
+    assert sym.stabilizer(state, values).classes == [["t1", "t3"]]
+
+def test_canonical_state_includes_numeric_values():
+    (domain, problem) = refuel_problem(["t1", "t2"])
+    sym = symmetry.findSymmetries(domain, problem)
+    state = grounding.initialAtoms(problem)
+    one = sym.canonical_state(state, {("fuel", "t1"): 11.0, ("fuel", "t2"): 10.0})
+    two = sym.canonical_state(state, {("fuel", "t1"): 10.0, ("fuel", "t2"): 11.0})
+    assert one == two
+    assert one != sym.canonical_state(state, {("fuel", "t1"): 11.0, ("fuel", "t2"): 11.0})
+
+def goal_distance(operators, init, goal, sym=None, canonical=False):
+    """ returns the length of a shortest plan found by breadth-first search, keeping one applicable operator per
+    orbit in each state if sym is given, and merging symmetric states if canonical is set"""
+    generator = SuccessorGenerator(operators)
+    norm = sym.canonical_state if canonical else frozenset
+    start = norm(init)
+    distance = {start: 0}
+    queue = deque([start])
+    while queue:
+        state = queue.popleft()
+        if goal <= state:
+            return distance[state]
+        ids = [i for i in generator.get_applicable_ids(state) if operators[i].is_applicable(state)]
+        if sym is not None:
+            ids = sym.prune_applicable(operators, ids, state)
+        for i in ids:
+            succ = norm(operators[i].apply(state))
+            if succ not in distance:
+                distance[succ] = distance[state] + 1
+                queue.append(succ)
+    return None
+
+def test_pruning_at_search_time_keeps_the_goal_reachable():
+    # both packages start at l0 and go to l1, so they are interchangeable, and so are the trucks
+    (domain, problem) = (logistics_domain(), logistics_problem(trucks=2, locations=3, packages=2))
+    problem.initialstate = [x for x in problem.initialstate if x.asPDDL() != "(pat p1 l1)"] + [atom("pat", "p1", "l0")]
+    problem.goal = Formula([atom("pat", "p0", "l1"), atom("pat", "p1", "l1")], "and")
+    sym = symmetry.findSymmetries(domain, problem)
+    assert sorted(sym.classes) == [["p0", "p1"], ["t0", "t1"]]
+    operators = grounding.groundActions(domain, problem)
+    init = grounding.initialAtoms(problem)
+    goal = frozenset(grounding.goalAtoms(problem, True))
+    optimal = goal_distance(operators, init, goal)
+    assert optimal == 5
+    assert goal_distance(operators, init, goal, sym) == optimal
+    assert goal_distance(operators, init, goal, sym, True) == optimal
+    # keeping only the canonical operators themselves loses (load p1 t0 l0), which the second package needs
+    canonical = [op for op in operators if sym.canonical_args(op.args) == op.args]
+    assert goal_distance(canonical, init, goal) is None
+
+def test_report_counts_orbits():
+    report = symmetry.symmetryReport(logistics_domain(), logistics_problem())
+    assert "36 ground operators in 18 orbits\n" in report
+    assert report.endswith("(at most 10000)")
+
+def test_report_without_state_limit():
+    report = symmetry.symmetryReport(logistics_domain(), logistics_problem(), None)
+    # 3 * 3 truck positions times 5 positions for each package, and one state per orbit of swapping the
+    # trucks: 27 of the states (trucks together, no package in a truck) are fixed, so (225 + 27) / 2 orbits
+    assert report.endswith("\n225 states expanded, 126 with canonical states")
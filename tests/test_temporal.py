@@ -0,0 +1,84 @@
+from pythonpddl.pddl import ConstantNumber, DurativeAction, Formula, Problem, TimedFormula, TypedArgList
+from pythonpddl.temporal import SnapActions, Timeline
+
+from helpers import atom, fhead, negated_effect, typed
+
+
+def til(time, formula):
+    return TimedFormula(time, formula)
+
+def timeline():
+    """ a shop which is open from 8 to 17, closes and reopens at 12, and has a delivery from 10 on"""
+    objects = TypedArgList(typed(["shop"], None))
+    init = [atom("staffed", "shop"),
+            til(17.0, Formula([atom("open", "shop")], "not")),
+            til(8.0, atom("open", "shop")),
+            til(12.0, Formula([atom("open", "shop")], "not")),
+            til(12.0, atom("open", "shop")),
+            til(10.0, atom("delivered", "shop"))]
+    return Timeline(Problem("p", "d", objects, init, Formula([], "and")))
+
+
+def test_events_are_sorted_by_time_then_file_order():
+    tl = timeline()
+    assert len(tl) == 5
+    assert tl.times == [8.0, 10.0, 12.0, 12.0, 17.0]
+    assert tl.values == [True, True, False, True, False]
+    # the later of two events at the same time wins
+    assert tl.holds_at(("open", "shop"), 12.0)
+
+def test_holds_at_event_times():
+    tl = timeline()
+    assert not tl.holds_at(("open", "shop"), 7.9)
+    assert tl.holds_at(("open", "shop"), 8.0)
+    assert tl.holds_at(("open", "shop"), 16.9)
+    assert not tl.holds_at(("open", "shop"), 17.0)
+    assert tl.holds_at(("staffed", "shop"), 100.0)
+
+def test_state_at():
+    tl = timeline()
+    assert tl.state_at(0.0) == set([("staffed", "shop")])
+    assert tl.state_at(10.0) == set([("staffed", "shop"), ("open", "shop"), ("delivered", "shop")])
+    assert tl.state_at(20.0) == set([("staffed", "shop"), ("delivered", "shop")])
+    for t in [0.0, 8.0, 9.0, 12.0, 17.0]:
+        assert tl.state_at(t) == tl.apply_events(tl.initial, -1.0, t)
+
+def test_events_between_bounds():
+    tl = timeline()
+    assert tl.events_between(8.0, 12.0) == [(10.0, ("delivered", "shop"), True), (12.0, ("open", "shop"), False),
+                                            (12.0, ("open", "shop"), True)]
+    assert tl.events_between(12.0, 17.0) == [(17.0, ("open", "shop"), False)]
+    assert tl.events_between(17.0, 100.0) == []
+    assert tl.next_time(8.0) == 10.0
+    assert tl.next_time(7.0) == 8.0
+    assert tl.next_time(17.0) is None
+
+
+def drive():
+    params = TypedArgList(typed(["?t"], "truck") + typed(["?a", "?b"], "location"))
+    return DurativeAction("drive", params, ConstantNumber(2.0), ConstantNumber(2.0),
+                          [TimedFormula("start", atom("at", "?t", "?a")),
+                           TimedFormula("all", atom("road", "?a", "?b"))],
+                          [TimedFormula("start", negated_effect("at", "?t", "?a")),
+                           TimedFormula("end", atom("at", "?t", "?b")),
+                           TimedFormula("end", Formula([fhead("fuel", "?t"), ConstantNumber(1.0)], "decrease",
+                                                       is_effect=True, is_numeric=True))])
+
+def test_lifted_snap_actions():
+    snaps = SnapActions(drive())
+    assert (snaps.start.pre_pos, snaps.start.add_eff, snaps.start.del_eff) == ([("at", "?t", "?a")], [], [("at", "?t", "?a")])
+    assert (snaps.invariant.pre_pos, snaps.invariant.add_eff, snaps.invariant.del_eff) == ([("road", "?a", "?b")], [], [])
+    assert (snaps.end.pre_pos, snaps.end.add_eff, snaps.end.del_eff) == ([], [("at", "?t", "?b")], [])
+    assert snaps.start.num_eff == []
+    assert [x.asPDDL() for x in snaps.end.num_eff] == ["(decrease (fuel ?t) 1.0)"]
+
+def test_ground_snap_actions():
+    snaps = SnapActions(drive()).ground(["t", "a", "b"])
+    assert snaps.args == ("t", "a", "b")
+    assert snaps.start.del_eff == [("at", "t", "a")]
+    assert snaps.invariant.pre_pos == [("road", "a", "b")]
+    assert snaps.end.add_eff == [("at", "t", "b")]
+    assert [x.asPDDL() for x in snaps.end.num_eff] == ["(decrease (fuel t) 1.0)"]
+    state = set([("at", "t", "a"), ("road", "a", "b")])
+    assert snaps.start.is_applicable(state)
+    assert snaps.end.apply(snaps.start.apply(state)) == frozenset([("at", "t", "b"), ("road", "a", "b")])
@@ -0,0 +1,87 @@
+import io
+
+import pytest
+
+from pythonpddl.pddl import Problem, TypedArg, TypedArgList
+
+from helpers import atom, logistics_problem
+
+
+def equivalent(v):
+    """ returns the Problem with the objects and initial state of a variant"""
+    return Problem(v.name, v.domainname, TypedArgList(list(v.objects.args)), list(v.initialstate), v.goal, v.metric)
+
+def changed_variant(base):
+    v = base.variant("changed")
+    v.add_object("t9", "truck")
+    v.remove_object("t1")
+    v.add_init(atom("at", "t9", "l1"))
+    v.remove_init(atom("at", "t1", "l0"))
+    return v
+
+
+def test_variant_matches_an_equivalent_problem():
+    v = changed_variant(logistics_problem())
+    expected = logistics_problem()
+    expected.name = "changed"
+    expected.objects = TypedArgList([o for o in expected.objects.args if o.arg_name != "t1"] + [TypedArg("t9", "truck")])
+    expected.initialstate = [x for x in expected.initialstate if x.asPDDL() != "(at t1 l0)"] + [atom("at", "t9", "l1")]
+    assert v.objects.asPDDL() == expected.objects.asPDDL()
+    assert [x.asPDDL() for x in v.initialstate] == [x.asPDDL() for x in expected.initialstate]
+    assert v.asPDDL() == expected.asPDDL()
+
+def test_write_pddl():
+    v = changed_variant(logistics_problem())
+    out = io.StringIO()
+    v.writePDDL(out)
+    assert out.getvalue() == v.asPDDL() == equivalent(v).asPDDL()
+
+def test_remove_object():
+    base = logistics_problem()
+    v = base.variant()
+    v.remove_object("p0")
+    assert "p0" not in [o.arg_name for o in v.objects.args]
+    with pytest.raises(Exception):
+        v.remove_object("p0")
+    with pytest.raises(Exception):
+        v.remove_object("p9")
+    v.add_object("p9", "package")
+    v.remove_object("p9")
+    v.add_object("p0", "package")
+    assert v.asPDDL() == base.asPDDL()
+
+def test_variant_of_a_variant():
+    base = logistics_problem()
+    text = base.asPDDL()
+    v = changed_variant(base)
+    w = v.variant("again")
+    w.remove_object("t9")
+    w.remove_init(atom("at", "t9", "l1"))
+    w.add_init(atom("at", "t1", "l0"))
+    w.add_object("t1", "truck")
+    assert "t9" in v.objects.asPDDL()
+    assert w.asPDDL() == base.asPDDL().replace("(problem delivery)", "(problem again)")
+    assert base.asPDDL() == text
+
+def test_adding_present_elements_is_a_no_op():
+    base = logistics_problem()
+    v = base.variant()
+    v.add_object("t0", "truck")
+    v.add_init(atom("at", "t0", "l0"))
+    assert v.asPDDL() == base.asPDDL()
+    v.add_object("t9", "truck")
+    v.add_object("t9", "truck")
+    v.add_init(atom("at", "t9", "l0"))
+    v.add_init(atom("at", "t9", "l0"))
+    assert [o.arg_name for o in v.objects.args].count("t9") == 1
+    assert [x.asPDDL() for x in v.initialstate].count("(at t9 l0)") == 1
+
+def test_removed_base_element_can_be_added_back():
+    base = logistics_problem()
+    v = base.variant()
+    v.remove_init(atom("at", "t0", "l0"))
+    assert "(at t0 l0)" not in v.asPDDL()
+    with pytest.raises(Exception):
+        v.remove_init(atom("at", "t0", "l0"))
+    v.add_init(atom("at", "t0", "l0"))
+    assert v.asPDDL() == base.asPDDL()